@@ -0,0 +1,59 @@
+"""Compare number_of_cross with the pairwise reference implementation.
+
+    python benchmarks/cross.py
+    python benchmarks/cross.py --sizes 10 30 60 --repeat 1
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import networkx as nx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tsmpy.tsm.utils import number_of_cross, number_of_cross_pairwise, has_cross  # noqa: E402
+
+
+def jittered_grid(n, seed=0):
+    """n x n grid graph with slightly moved nodes, and both diagonals in n cells"""
+    rng = random.Random(seed)
+    G = nx.grid_2d_graph(n, n)
+    pos = {(i, j): (i + rng.uniform(-0.2, 0.2), j + rng.uniform(-0.2, 0.2))
+           for i, j in G}
+    for _ in range(n):
+        i, j = rng.randrange(n - 1), rng.randrange(n - 1)
+        G.add_edge((i, j), (i + 1, j + 1))
+        G.add_edge((i + 1, j), (i, j + 1))
+    return G, pos
+
+
+def best_of(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 20, 40])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'edges':>8} {'crossings':>10} {'pairwise':>10} {'grid':>10} {'has_cross':>10} {'speedup':>8}")
+    for n in args.sizes:
+        G, pos = jittered_grid(n)
+        t_pair, n_pair = best_of(lambda: number_of_cross_pairwise(G, pos), args.repeat)
+        t_grid, n_grid = best_of(lambda: number_of_cross(G, pos), args.repeat)
+        t_any, _ = best_of(lambda: has_cross(G, pos), args.repeat)
+        assert n_pair == n_grid, (n_pair, n_grid)
+        print(f"{G.number_of_edges():>8} {n_grid:>10} {t_pair:>10.4f} {t_grid:>10.4f} "
+              f"{t_any:>10.4f} {t_pair / t_grid:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
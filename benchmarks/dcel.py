@@ -0,0 +1,108 @@
+"""Compare Dcel with the array-backed CompactDcel.
+
+Times building the DCEL, walking every face through handles and through
+face_cycle, the iterations used to build the flow network, and a full
+ortho_layout; and measures DCEL memory.
+
+    python benchmarks/dcel.py
+    python benchmarks/dcel.py --grid 150 --layout-grid 40
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+import networkx as nx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tsmpy import ortho_layout  # noqa: E402
+from tsmpy.dcel import Dcel, CompactDcel  # noqa: E402
+from tsmpy.tsm.utils import rotation_system  # noqa: E402
+
+
+def grid(n):
+    G = nx.convert_node_labels_to_integers(nx.grid_2d_graph(n, n), label_attribute="pos")
+    return G, {node: G.nodes[node]["pos"] for node in G}
+
+
+def timed(func, repeat=1):
+    """Best time of repeat runs, and the result of the last one.
+    Garbage collection is off while timing, as in timeit.
+    """
+    best = float("inf")
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best, result
+
+
+def walk(dcel):
+    for face in dcel.faces.values():
+        for he in face.surround_half_edges():
+            he.twin.inc
+
+
+def walk_cycles(dcel):
+    for face in dcel.faces.values():
+        for _ in dcel.face_cycle(face.inc):
+            pass
+
+
+def flow_network_input(dcel):
+    for _ in dcel.face_degrees():
+        pass
+    for _ in dcel.corners():
+        pass
+    for _ in dcel.dual_edges():
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--grid", type=int, default=100, help="n of the n x n grid for DCEL timings")
+    parser.add_argument("--layout-grid", type=int, default=30, help="n of the n x n grid for ortho_layout")
+    parser.add_argument("--repeat", type=int, default=3, help="report the best of this many runs")
+    args = parser.parse_args()
+    repeat = args.repeat
+
+    G, pos = grid(args.grid)
+    embedding = rotation_system(G, pos)
+    print(f"{args.grid}x{args.grid} grid, {G.number_of_edges() * 2} half-edges")
+    print(f"{'':>12} {'build':>8} {'handles':>8} {'cycles':>8} {'flownet':>8} {'MB':>8}")
+    for cls in (Dcel, CompactDcel):
+        tracemalloc.start()  # measured apart, tracing slows down allocation
+        dcel = cls(G, embedding)
+        memory = tracemalloc.get_traced_memory()[0] / 2 ** 20
+        tracemalloc.stop()
+        del dcel
+        t_build, dcel = timed(lambda: cls(G, embedding), repeat)
+        t_walk, _ = timed(lambda: walk(dcel), repeat)
+        t_cycles, _ = timed(lambda: walk_cycles(dcel), repeat)
+        t_flow, _ = timed(lambda: flow_network_input(dcel), repeat)
+        print(f"{cls.__name__:>12} {t_build:>8.3f} {t_walk:>8.3f} {t_cycles:>8.3f} "
+              f"{t_flow:>8.3f} {memory:>8.1f}")
+        del dcel
+
+    G, pos = grid(args.layout_grid)
+    print(f"\northo_layout on a {args.layout_grid}x{args.layout_grid} grid")
+    print(f"{'':>12} {'seconds':>8} {'peak MB':>8}")
+    for compact in (False, True):
+        t_layout, _ = timed(lambda: ortho_layout(G, pos, uselp=False, compact=compact), repeat)
+        tracemalloc.start()
+        ortho_layout(G, pos, uselp=False, compact=compact)
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+        print(f"{'CompactDcel' if compact else 'Dcel':>12} {t_layout:>8.3f} {peak:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
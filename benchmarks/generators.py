@@ -0,0 +1,76 @@
+"""Connected planar graphs with maximum degree 4, of about n nodes.
+
+Every generator returns (G, pos), pos is a straight-line planar drawing or
+None when the embedding is left to networkx.check_planarity. Nodes are
+0..n-1 and the result depends only on n and seed.
+"""
+import random
+
+import networkx as nx
+
+
+def grid(n, seed=0):
+    """Square grid"""
+    side = max(2, round(n ** 0.5))
+    G = nx.convert_node_labels_to_integers(nx.grid_2d_graph(side, side), label_attribute="pos")
+    return G, {node: G.nodes[node]["pos"] for node in G}
+
+
+def tree(n, seed=0):
+    """Random recursive tree, every node hangs from a random node of degree < 4"""
+    rng = random.Random(seed)
+    G = nx.Graph()
+    G.add_node(0)
+    open_nodes = [0]
+    for v in range(1, n):
+        i = rng.randrange(len(open_nodes))
+        u = open_nodes[i]
+        G.add_edge(u, v)
+        if G.degree(u) == 4:
+            open_nodes[i] = open_nodes[-1]
+            open_nodes.pop()
+        open_nodes.append(v)
+    return G, None
+
+
+def triangulation(n, seed=0):
+    """Jittered grid triangulated with a random diagonal in every cell, then
+    reduced to degree 4 by dropping diagonals at nodes of higher degree
+    """
+    rng = random.Random(seed)
+    side = max(2, round(n ** 0.5))
+    G, pos = grid(side * side)
+    pos = {node: (x + rng.uniform(-0.2, 0.2), y + rng.uniform(-0.2, 0.2))
+           for node, (x, y) in pos.items()}
+    diagonals = []
+    for i in range(side - 1):
+        for j in range(side - 1):
+            if rng.random() < 0.5:
+                diagonals.append((i * side + j, (i + 1) * side + j + 1))
+            else:
+                diagonals.append(((i + 1) * side + j, i * side + j + 1))
+    G.add_edges_from(diagonals)
+    rng.shuffle(diagonals)
+    for u, v in diagonals:  # the grid edges keep it connected
+        if G.degree(u) > 4 or G.degree(v) > 4:
+            G.remove_edge(u, v)
+    return G, pos
+
+
+def chain(n, seed=0):
+    """Path folded into a zigzag of rows of about sqrt(n) nodes"""
+    width = max(2, round(n ** 0.5))
+    G = nx.path_graph(n)
+    pos = {}
+    for node in G:
+        row, col = divmod(node, width)
+        pos[node] = (col if row % 2 == 0 else width - 1 - col, row)
+    return G, pos
+
+
+GENERATORS = {
+    "grid": grid,
+    "tree": tree,
+    "triangulation": triangulation,
+    "chain": chain,
+}
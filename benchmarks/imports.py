@@ -0,0 +1,64 @@
+"""Time `import tsmpy` in fresh interpreters.
+
+Reports the best import time and the resident memory after importing, and
+which optional heavy modules got loaded. The layout core must not load
+matplotlib, pulp or the LP backends, so the exit status is 1 if any of
+them is imported, or if the import takes longer than --budget-ms.
+
+    python benchmarks/imports.py
+    python benchmarks/imports.py --module tsmpy.tsm.tsm --repeat 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ["matplotlib", "pulp", "numpy", "scipy", "highspy"]
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": seconds,
+    "maxrss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "loaded": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def probe(module):
+    out = subprocess.run([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY)],
+                         cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="tsmpy")
+    parser.add_argument("--repeat", type=int, default=5, help="report the best of this many runs")
+    parser.add_argument("--budget-ms", type=float, help="fail if the best import is slower")
+    args = parser.parse_args()
+
+    baseline = min(probe("networkx")["seconds"] for _ in range(args.repeat))
+    runs = [probe(args.module) for _ in range(args.repeat)]
+    best = min(run["seconds"] for run in runs)
+    loaded = sorted({m for run in runs for m in run["loaded"]})
+    print(f"import {args.module}: {best * 1000:.1f} ms "
+          f"({(best - baseline) * 1000:.1f} ms over networkx), "
+          f"max RSS {min(run['maxrss_kb'] for run in runs) / 1024:.1f} MB")
+    print(f"heavy modules loaded: {', '.join(loaded) or 'none'}")
+
+    failed = bool(loaded)
+    if args.budget_ms is not None and best * 1000 > args.budget_ms:
+        print(f"slower than the budget of {args.budget_ms} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
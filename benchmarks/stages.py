@@ -0,0 +1,160 @@
+"""Time every stage of the layout pipeline on generated graphs.
+
+Runs Planarization, Orthogonalization (network simplex, and the LP for
+graphs up to --lp-max-nodes) and Compaction one after another, reports
+the best time of each stage over --repeat runs and its peak memory, and
+writes everything to a JSON file. With --compare, stages are matched with
+an earlier result file and those slower by more than --threshold (and
+--min-delta seconds) are flagged, the exit status is then 1.
+
+    python benchmarks/stages.py --output before.json
+    python benchmarks/stages.py --output after.json --compare before.json
+    python benchmarks/stages.py --generators grid chain --sizes 100 1000 10000
+    python benchmarks/stages.py --compaction longest_path
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generators import GENERATORS  # noqa: E402
+from tsmpy.tsm.planarization import Planarization  # noqa: E402
+from tsmpy.tsm.orthogonalization import Orthogonalization  # noqa: E402
+from tsmpy.tsm.compaction import Compaction  # noqa: E402
+
+
+def pipeline(G, pos, uselp, method):
+    """Yield (stage name, function) in order, each taking the result of the last"""
+    suffix = "lp" if uselp else "flow"
+    yield "planarization", lambda _: Planarization(G, pos)
+    yield f"orthogonalization-{suffix}", lambda planar: Orthogonalization(planar, uselp)
+    name = f"compaction-{suffix}" if method == "flow" else f"compaction-{suffix}-{method}"
+    yield name, lambda ortho: Compaction(ortho, method=method)
+
+
+def run(G, pos, uselp, repeat, method):
+    """Best seconds and peak MB of every stage"""
+    seconds = {}
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()  # as in timeit
+        try:
+            result = None
+            for stage, func in pipeline(G, pos, uselp, method):
+                start = time.perf_counter()
+                result = func(result)
+                elapsed = time.perf_counter() - start
+                seconds[stage] = min(seconds.get(stage, elapsed), elapsed)
+        finally:
+            gc.enable()
+
+    peak = {}  # measured apart, tracing slows down allocation
+    tracemalloc.start()
+    result = None
+    for stage, func in pipeline(G, pos, uselp, method):
+        tracemalloc.reset_peak()
+        result = func(result)
+        peak[stage] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(records, baseline, threshold, min_delta):
+    """Print the ratio of every stage to the baseline, return the regressions"""
+    old = {(r["generator"], r["size"], r["stage"]): r for r in baseline["records"]}
+    regressions = []
+    print(f"\n{'generator':>14} {'size':>7} {'stage':>24} {'before':>8} {'after':>8} {'ratio':>6}")
+    for r in records:
+        before = old.get((r["generator"], r["size"], r["stage"]))
+        if before is None or before.get("seconds") is None or r.get("seconds") is None:
+            continue
+        ratio = r["seconds"] / max(before["seconds"], 1e-9)
+        flag = ""
+        if ratio > 1 + threshold and r["seconds"] - before["seconds"] > min_delta:
+            flag = " slower"
+            regressions.append(r)
+        print(f"{r['generator']:>14} {r['size']:>7} {r['stage']:>24} "
+              f"{before['seconds']:>8.3f} {r['seconds']:>8.3f} {ratio:>6.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--generators", nargs="+", default=list(GENERATORS), choices=list(GENERATORS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000],
+                        help="approximate numbers of nodes, up to 100000")
+    parser.add_argument("--repeat", type=int, default=3, help="report the best of this many runs")
+    parser.add_argument("--lp-max-nodes", type=int, default=1000,
+                        help="skip the LP on larger graphs, 0 to never run it")
+    parser.add_argument("--compaction", default="flow", choices=["flow", "longest_path"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="flag stages slower than the earlier run by this fraction")
+    parser.add_argument("--min-delta", type=float, default=0.005,
+                        help="and by this many seconds, shorter differences are noise")
+    args = parser.parse_args()
+
+    records = []
+    print(f"{'generator':>14} {'size':>7} {'nodes':>7} {'edges':>7} {'stage':>24} {'seconds':>8} {'peak MB':>8}")
+    for name in args.generators:
+        for size in args.sizes:
+            G, pos = GENERATORS[name](size, args.seed)
+            for uselp in (False, True):
+                if uselp and len(G) > args.lp_max_nodes:
+                    continue
+                base = {"generator": name, "size": size, "nodes": len(G),
+                        "edges": G.number_of_edges()}
+                try:
+                    seconds, peak = run(G, pos, uselp, args.repeat, args.compaction)
+                except Exception as e:  # recorded, the other cases still run
+                    records.append({**base, "stage": "lp" if uselp else "flow", "error": repr(e)})
+                    print(f"{name:>14} {size:>7} {len(G):>7} {G.number_of_edges():>7} failed: {e!r}")
+                    continue
+                for stage in seconds:
+                    if uselp and stage == "planarization":
+                        continue  # the same as without the LP
+                    records.append({**base, "stage": stage, "seconds": seconds[stage],
+                                    "peak_mb": peak[stage]})
+                    print(f"{name:>14} {size:>7} {len(G):>7} {G.number_of_edges():>7} {stage:>24} "
+                          f"{seconds[stage]:>8.3f} {peak[stage]:>8.1f}")
+
+    result = {
+        "commit": commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "compaction": args.compaction,
+        "records": records,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(records, json.load(f), args.threshold, args.min_delta)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
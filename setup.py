@@ -25,5 +25,7 @@ setup(
         "graph",
     ],
     install_requires=["networkx", "pulp"],
+    extras_require={"highs": ["highspy", "numpy"], "arrays": ["numpy"]},
+    entry_points={"console_scripts": ["tsmpy=tsmpy.tsm.cli:main"]},
     python_requires=">=3.6",
 )
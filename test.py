@@ -1,8 +1,29 @@
 import networkx as nx
-from tsmpy import TSM
+from tsmpy import TSM, ortho_layout, ortho_layout_many, is_bendnode, LayoutCache, Collector, \
+    write_svg, write_json, layout_arrays, postcheck
+from tsmpy.tsm.utils import number_of_cross, number_of_cross_pairwise, has_cross, \
+    overlap_nodes, overlay_edges, convert_pos_to_embedding, rotation_system
+from tsmpy.dcel import Dcel, CompactDcel
+from tsmpy.tsm.flownet import FlowNet
+from tsmpy.tsm.mincostflow import network_simplex, InfeasibleError
+from tsmpy.tsm import lpsolver
+from tsmpy.tsm.lpsolver import LpModel, available_backends
+from tsmpy.tsm.planarization import Planarization
+from tsmpy.tsm.orthogonalization import Orthogonalization
+from tsmpy.tsm.stable import StableLayout
+from tsmpy.tsm.planarize import planar_subgraph, planarize
+from tsmpy.tsm.export import edge_paths
+from tsmpy.tsm import cli
 from matplotlib import pyplot as plt
 import unittest
+import random
 import os
+import tempfile
+import subprocess
+import sys
+import io
+import json
+import xml.etree.ElementTree as ET
 
 os.makedirs("test/outputs", exist_ok=True)
 
@@ -31,6 +52,19 @@ class TestRefine(unittest.TestCase):
         plt.savefig("test/outputs/cross.svg")
         plt.close()
 
+    def test_comb(self):  # one face with many reflex corners
+        G = nx.Graph()
+        pos = {}
+        for i in range(60):
+            pos[2 * i], pos[2 * i + 1] = (2 * i, 0), (2 * i, 3)
+            G.add_edge(2 * i, 2 * i + 1)
+            if i:
+                G.add_edge(2 * i - 2, 2 * i)
+        H, layout = ortho_layout(G, pos, uselp=False)
+        self.assertFalse(has_cross(H, layout))
+        self.assertEqual(list(overlay_edges(H, layout)), [])
+        self.assertEqual(list(overlap_nodes(H, layout)), [])
+
 class TestGML(unittest.TestCase):
     @staticmethod
     def _test(filename, uselp):
@@ -127,7 +161,705 @@ class TestGrid(unittest.TestCase):
     def test_1x99(self):
         TestGrid._test_grid(1, 99)
 
+    def test_2x1500(self):  # more faces in a row than the recursion limit
+        G = nx.grid_2d_graph(2, 1500)
+        H, pos = ortho_layout(G, {node: node for node in G}, uselp=False)
+        self.assertEqual(len(pos), len(H))
+        for u, v in H.edges:
+            self.assertTrue(pos[u][0] == pos[v][0] or pos[u][1] == pos[v][1])
+
+
+class TestLongestPath(unittest.TestCase):
+    def _check(self, G, pos):
+        for compact in (False, True):
+            H, layout = ortho_layout(G, pos, uselp=False, compact=compact, compaction="longest_path")
+            self.assertEqual(set(layout), set(H))
+            for u, v in H.edges:
+                self.assertTrue(layout[u][0] == layout[v][0] or layout[u][1] == layout[v][1])
+            self.assertFalse(has_cross(H, layout))
+            self.assertEqual(list(overlay_edges(H, layout)), [])
+            self.assertEqual(list(overlap_nodes(H, layout)), [])
+
+    def test_gml(self):
+        for i in range(1, 9):
+            G = nx.Graph(nx.read_gml(f"test/inputs/case{i}.gml"))
+            self._check(G, {node: eval(node) for node in G})
+
+    def test_comb(self):
+        G = nx.Graph()
+        pos = {}
+        for i in range(30):
+            pos[2 * i], pos[2 * i + 1] = (2 * i, 0), (2 * i, 3)
+            G.add_edge(2 * i, 2 * i + 1)
+            if i:
+                G.add_edge(2 * i - 2, 2 * i)
+        self._check(G, pos)
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            ortho_layout(nx.cycle_graph(4), compaction="shortest")
+
+
+class TestCompact(unittest.TestCase):
+    def _test(self, G, pos):
+        H, layout = ortho_layout(G, pos, uselp=False, compact=True)
+        H0, layout0 = ortho_layout(G, pos, uselp=False)
+        self.assertEqual(set(G), {node for node in H if not is_bendnode(node)})
+        self.assertEqual(len(H), len(H0))
+        for u, v in H.edges:
+            self.assertTrue(layout[u][0] == layout[v][0] or layout[u][1] == layout[v][1])
+        self.assertFalse(has_cross(H, layout))
+        self.assertEqual(number_of_cross(H, layout), 0)
+        self.assertEqual(list(overlay_edges(H, layout)), [])
+        self.assertEqual(list(overlap_nodes(H, layout)), [])
+
+    @staticmethod
+    def _faces(dcel):
+        """{face id: half-edge ids around it, starting from the smallest}"""
+        faces = {}
+        for face in dcel.faces.values():
+            hes = [he.id for he in face.surround_half_edges()]
+            i = hes.index(min(hes, key=repr))
+            faces[face.id] = hes[i:] + hes[:i]
+            for he in face.surround_half_edges():
+                assert he.inc == face and he.twin.twin == he and he.succ.prev == he
+            assert len(face) == len(hes)
+        return faces
+
+    def _dcels(self):
+        G = nx.cycle_graph(4)
+        pos = {0: (0, 0), 1: (0, 1), 2: (1, 1), 3: (1, 0)}
+        embedding = convert_pos_to_embedding(G, pos)
+        return Dcel(G, embedding), CompactDcel(G, embedding)
+
+    def test_add_node_between(self):
+        for dcel in self._dcels():
+            dcel.add_node_between(0, "m", 1)
+            self.assertNotIn((0, 1), dcel.half_edges)
+            self.assertEqual(dcel.half_edges[0, "m"].succ.id, ("m", 1))
+            self.assertEqual(dcel.half_edges[1, "m"].succ.id, ("m", 0))
+            self.assertEqual(dcel.vertices["m"].id, "m")
+        dcel, compact = self._dcels()
+        dcel.add_node_between(0, "m", 1)
+        compact.add_node_between(0, "m", 1)
+        self.assertEqual(self._faces(compact), self._faces(dcel))
+
+    def test_connect(self):
+        dcel, compact = self._dcels()
+        for d in (dcel, compact):
+            face = d.half_edges[0, 1].inc
+            d.connect(face, 0, 2, d.half_edge_map(), 1)
+            self.assertEqual(len(d.faces), 3)
+            self.assertEqual(d.half_edges[0, 2].twin.id, (2, 0))
+            self.assertEqual(len(d.half_edges[0, 2].inc), 3)
+            self.assertEqual(len(d.half_edges[2, 0].inc), 3)
+        self.assertEqual(self._faces(compact), self._faces(dcel))
+
+    def test_border(self):  # face sizes are kept by add_border and connect_diff
+        dcel, compact = self._dcels()
+        for d in (dcel, compact):
+            face = d.half_edges[1, 0].inc  # outside of the cycle
+            d.add_border(["a", "b", "c", "d"], face, ("face", -1))
+            d.connect_diff(face, 0, "a")
+            self.assertEqual(len(face), 4 + 4 + 2)
+            self.assertEqual(len(d.faces[("face", -1)]), 4)
+        self.assertEqual(self._faces(compact), self._faces(dcel))
+
+    def test_gml(self):
+        G = nx.Graph(nx.read_gml("test/inputs/case3.gml"))
+        self._test(G, {node: eval(node) for node in G})
+
+    def test_grid(self):
+        G = nx.grid_2d_graph(4, 6)
+        self._test(G, {node: node for node in G})
+
+
+class TestUtils(unittest.TestCase):
+    def test_number_of_cross(self):
+        rng = random.Random(0)
+        for seed in range(50):
+            G = nx.gnm_random_graph(12, 20, seed=seed)
+            if seed % 2:  # integer coordinates give many collinear cases
+                pos = {v: (rng.randint(0, 4), rng.randint(0, 4)) for v in G}
+            else:
+                pos = {v: (rng.random(), rng.random()) for v in G}
+            expected = number_of_cross_pairwise(G, pos)
+            self.assertEqual(number_of_cross(G, pos), expected)
+            self.assertEqual(has_cross(G, pos), expected > 0)
+
+    def test_overlay(self):
+        G = nx.Graph([(0, 1), (2, 3), (4, 5), (6, 7), (8, 9)])
+        pos = {0: (0, 0), 1: (0, 3), 2: (0, 2), 3: (0, 5),  # overlap
+               4: (0, 5), 5: (0, 6),  # only touches (2, 3)
+               6: (1, 1), 7: (4, 1), 8: (4, 1), 9: (4, 1)}  # point on an end
+        self.assertEqual(set(overlay_edges(G, pos)), {(0, 1), (2, 3)})
+        self.assertEqual(set(overlap_nodes(G, pos)), {3, 4, 7, 8, 9})
+
+    def test_rotation_system(self):  # the same faces as the PlanarEmbedding
+        rng = random.Random(0)
+        for _ in range(10):
+            G = nx.grid_2d_graph(6, 6)
+            pos = {(x, y): (x + rng.uniform(-0.3, 0.3), y + rng.uniform(-0.3, 0.3)) for x, y in G}
+            for x in range(5):
+                for y in range(5):
+                    if rng.random() < 0.5:
+                        G.add_edge((x, y), (x + 1, y + 1))
+                    else:
+                        G.add_edge((x + 1, y), (x, y + 1))
+            rotation = rotation_system(G, pos)
+            embedding = convert_pos_to_embedding(G, pos)
+            for u, v in G.edges:
+                for he in ((u, v), (v, u)):
+                    self.assertEqual(rotation.next_face_half_edge(*he),
+                                     embedding.next_face_half_edge(*he))
+            Planarization(G, pos)
+
+            G.add_edges_from([((2, 2), (3, 3)), ((3, 2), (2, 3))])  # crossing diagonals
+            with self.assertRaises(nx.NetworkXException):
+                Planarization(G, pos)
+            Planarization(G, pos, check_embedding=False)
+
+
+class TestMinCostFlow(unittest.TestCase):
+    @staticmethod
+    def _random_instance(rng):
+        n = rng.randint(2, 8)
+        arcs = []
+        for _ in range(rng.randint(1, 16)):
+            u, v = rng.randrange(n), rng.randrange(n)
+            lower = rng.randint(0, 2)
+            arcs.append((u, v, lower, lower + rng.randint(0, 4), rng.randint(-2, 5)))
+        demand = [0] * n
+        for _ in range(3):
+            a, b, k = rng.randrange(n), rng.randrange(n), rng.randint(0, 4)
+            demand[a] -= k
+            demand[b] += k
+        return n, arcs, demand
+
+    @staticmethod
+    def _reference_cost(n, arcs, demand):
+        """Cost by nx.min_cost_flow, after removing lower bounds and self-loops"""
+        G = nx.MultiDiGraph()
+        G.add_nodes_from(range(n), demand=0)
+        base = 0
+        for i, (u, v, lower, capacity, weight) in enumerate(arcs):
+            if u == v:
+                base += (capacity if weight < 0 else lower) * weight
+                continue
+            base += lower * weight
+            G.nodes[u]['demand'] += lower
+            G.nodes[v]['demand'] -= lower
+            G.add_edge(u, v, key=i, capacity=capacity - lower, weight=weight)
+        for v in range(n):
+            G.nodes[v]['demand'] += demand[v]
+        return base + nx.min_cost_flow_cost(G)
+
+    def test_random(self):
+        rng = random.Random(0)
+        feasible = infeasible = 0
+        for _ in range(200):
+            n, arcs, demand = self._random_instance(rng)
+            try:
+                expected = self._reference_cost(n, arcs, demand)
+            except nx.NetworkXUnfeasible:
+                infeasible += 1
+                with self.assertRaises(InfeasibleError):
+                    network_simplex(n, *map(list, zip(*arcs)), demand)
+                continue
+            feasible += 1
+            flow, cost = network_simplex(n, *map(list, zip(*arcs)), demand)
+            self.assertEqual(cost, expected)
+            balance = [0] * n
+            for f, (u, v, lower, capacity, weight) in zip(flow, arcs):
+                self.assertTrue(lower <= f <= capacity)
+                balance[u] -= f
+                balance[v] += f
+            self.assertEqual(balance, demand)
+        self.assertTrue(feasible and infeasible)
+
+    def test_fixed_arc(self):  # lower bound equals capacity
+        self.assertEqual(network_simplex(2, [0], [1], [1], [1], [-1], [-1, 1]), ([1], -1))
+        with self.assertRaises(InfeasibleError):
+            network_simplex(2, [0], [1], [1], [1], [1], [-2, 2])
+
+    def test_flownet(self):
+        flow = FlowNet()
+        flow.add_node('s', demand=-3)
+        flow.add_node('t', demand=3)
+        flow.add_edge('s', 't', 'a', lowerbound=1, capacity=2, weight=1)
+        flow.add_edge('s', 't', 'b', lowerbound=0, capacity=5, weight=2)
+        flow_dict = flow.min_cost_flow()
+        self.assertEqual(flow_dict['s']['t'], {'a': 2, 'b': 1})
+        self.assertEqual(flow.cost, 4)
+
+
+class TestLpSolver(unittest.TestCase):
+    @staticmethod
+    def _model():
+        # min x + 2y + |x - y|, x + y == 3, x <= 2, y >= 0
+        model = LpModel()
+        x = model.add_var(0, 2, 1)
+        y = model.add_var(0, None, 2)
+        p = model.add_var(None, None, 1)
+        model.add_row([(x, 1), (y, 1)], 3, 3)
+        model.add_row([(x, 1), (y, -1), (p, -1)], None, 0)
+        model.add_row([(y, 1), (x, -1), (p, -1)], None, 0)
+        return model
+
+    def test_backends(self):
+        for backend in available_backends() + ["auto"]:
+            self.assertEqual(lpsolver.solve(self._model(), backend), [2, 1, 1])
+
+    def test_infeasible(self):
+        model = self._model()
+        model.add_row([(0, 1)], 3, None)  # x >= 3
+        with self.assertRaises(InfeasibleError):
+            lpsolver.solve(model, "cbc")
+        with self.assertRaises(Exception):
+            lpsolver.solve(self._model(), "no such solver")
+
+    def test_resolve(self):  # costs and bounds changed in place
+        for backend in available_backends():
+            model = self._model()
+            self.assertEqual(lpsolver.solve(model, backend), [2, 1, 1])
+            model.cost[1] = 0
+            self.assertEqual(lpsolver.solve(model, backend), [1, 2, 1])
+            model.upper[0] = 0
+            self.assertEqual(lpsolver.solve(model, backend), [0, 3, 3])
+            model.cost[1], model.upper[0], model.row_upper[0] = 2, 2, None  # x + y >= 3
+            self.assertEqual(lpsolver.solve(model, backend), [2, 1, 1])
+
+    def test_orthogonalization_resolve(self):
+        G = nx.Graph(nx.read_gml("test/inputs/case4.gml"))
+        pos = {node: eval(node) for node in G}
+        for uselp in (False, True):
+            ortho = Orthogonalization(Planarization(G, pos), uselp=uselp)
+            cost, lp = ortho.flow_network.cost, ortho.lp
+            u, v, key = next((u, v, key) for u, v, key in ortho.flow_network.edges(keys=True)
+                             if u in ortho.dcel.faces and u != v
+                             and ortho.flow_dict[u][v][key] == 0)
+            flow_dict = ortho.resolve({(u, v, key): 1})
+            self.assertEqual(flow_dict[u][v][key], 1)
+            self.assertGreater(ortho.flow_network.cost, cost)
+            ortho.resolve()
+            self.assertEqual(ortho.flow_network.cost, cost)
+            self.assertIs(ortho.lp, lp)
+
+    def test_orthogonalization(self):  # every backend reaches the same optimum
+        G = nx.Graph(nx.read_gml("test/inputs/case4.gml"))
+        pos = {node: eval(node) for node in G}
+        costs = set()
+        for backend in available_backends():
+            ortho = Orthogonalization(Planarization(G, pos), uselp=True, solver=backend)
+            costs.add(ortho.flow_network.cost)
+            H, layout = ortho_layout(G, pos, uselp=True, solver=backend)
+            for u, v in H.edges:
+                self.assertTrue(layout[u][0] == layout[v][0] or layout[u][1] == layout[v][1])
+        self.assertEqual(len(costs), 1)
+
+
+class TestBatch(unittest.TestCase):
+    def test_many(self):
+        graphs = [nx.grid_2d_graph(i, 3) for i in range(2, 6)]
+        positions = [{node: node for node in G} for G in graphs]
+        graphs.insert(2, nx.complete_graph(5))  # not planar, fails
+        positions.insert(2, None)
+        expected = [None if pos is None else ortho_layout(G, pos, uselp=False)[1]
+                    for G, pos in zip(graphs, positions)]
+
+        for workers, chunksize, ordered in ((1, 1, True), (2, 2, True), (2, 1, False)):
+            results = list(ortho_layout_many(graphs, positions, workers=workers,
+                                             chunksize=chunksize, ordered=ordered, uselp=False))
+            if ordered:
+                self.assertEqual([i for i, _, _ in results], list(range(len(graphs))))
+            self.assertEqual(sorted(i for i, _, _ in results), list(range(len(graphs))))
+            for i, layout, error in results:
+                if expected[i] is None:
+                    self.assertIsNone(layout)
+                    self.assertIsInstance(error, Exception)
+                else:
+                    self.assertIsNone(error)
+                    self.assertEqual(layout[1], expected[i])
+
+
+class TestComponents(unittest.TestCase):
+    def test_disconnected(self):
+        parts = [nx.grid_2d_graph(3, 3), nx.path_graph(4), nx.empty_graph(1),
+                 nx.cycle_graph(5), nx.grid_2d_graph(2, 4)]
+        G = nx.disjoint_union_all(parts)
+        for workers in (1, 2):
+            H, pos = ortho_layout(G, uselp=False, workers=workers)
+            self.assertTrue(set(G) <= set(H))
+            self.assertEqual(len(pos), len(H))
+            self.assertFalse(has_cross(H, pos))
+            self.assertEqual(overlap_nodes(H, pos), [])
+            self.assertEqual(overlay_edges(H, pos), [])
+            for u, v in H.edges:
+                self.assertTrue(pos[u][0] == pos[v][0] or pos[u][1] == pos[v][1])
+
+    def test_data(self):  # kept as for a connected graph
+        class Graph(nx.Graph):
+            pass
+
+        G = Graph(nx.disjoint_union(nx.cycle_graph(4), nx.grid_2d_graph(3, 3)))
+        G.graph["name"] = "parts"
+        nx.set_node_attributes(G, "red", "color")
+        nx.set_edge_attributes(G, 2, "weight")
+        for workers in (1, 2):
+            H, _ = ortho_layout(G, uselp=False, workers=workers)
+            self.assertIs(type(H), Graph)
+            self.assertEqual(H.graph, G.graph)
+            for node in G:
+                self.assertEqual(H.nodes[node], {"color": "red"})
+            for u, v in G.edges:
+                if H.has_edge(u, v):
+                    self.assertEqual(H.edges[u, v], {"weight": 2})
+
+    def test_trivial(self):
+        self.assertEqual(ortho_layout(nx.empty_graph(0))[1], {})
+        self.assertEqual(ortho_layout(nx.empty_graph(1))[1], {0: (0, 0)})
+        G = nx.empty_graph(3)
+        G.add_edge(1, 2)
+        H, pos = ortho_layout(G)
+        self.assertEqual(len(set(pos.values())), 3)
+
+
+class TestCache(unittest.TestCase):
+    def test_cache(self):
+        G = nx.Graph(nx.read_gml("test/inputs/case2.gml"))
+        pos = {node: eval(node) for node in G}
+        with tempfile.TemporaryDirectory() as directory:
+            cache = LayoutCache(maxsize=1, directory=directory)
+            H, layout = cache.ortho_layout(G, pos)
+            self.assertEqual(cache.ortho_layout(G, pos)[1], layout)
+            # same embedding, other coordinates
+            moved = {node: (3 * x + 1, 2 * y) for node, (x, y) in pos.items()}
+            self.assertEqual(cache.ortho_layout(G, moved)[1], layout)
+            self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+            cache.ortho_layout(G, pos, uselp=False)
+            self.assertEqual((len(cache), cache.misses), (1, 2))
+
+            shared = LayoutCache(directory=directory)
+            H2, layout2 = shared.ortho_layout(G, pos)
+            self.assertEqual(shared.hits, 1)
+            self.assertEqual(layout2, layout)
+            self.assertEqual(set(H2.edges), set(H.edges))
+
+    def test_data(self):  # a hit returns what a miss does
+        G = nx.cycle_graph(4)
+        G.graph["name"] = "cycle"
+        nx.set_node_attributes(G, "red", "color")
+        nx.set_edge_attributes(G, 2, "weight")
+        cache = LayoutCache()
+        H, _ = cache.ortho_layout(G)
+        H2, _ = cache.ortho_layout(G)
+        self.assertEqual(cache.hits, 1)
+        self.assertIs(type(H2), type(H))
+        self.assertEqual(H2.graph, H.graph)
+        self.assertEqual(dict(H2.nodes(data=True)), dict(H.nodes(data=True)))
+        self.assertEqual({frozenset((u, v)): d for u, v, d in H2.edges(data=True)},
+                         {frozenset((u, v)): d for u, v, d in H.edges(data=True)})
+
+
+class TestStable(unittest.TestCase):
+    def _check(self, H, pos):
+        self.assertFalse(has_cross(H, pos))
+        self.assertEqual(overlap_nodes(H, pos), [])
+        self.assertEqual(overlay_edges(H, pos), [])
+        for u, v in H.edges:
+            self.assertTrue(pos[u][0] == pos[v][0] or pos[u][1] == pos[v][1])
+
+    def test_edits(self):
+        G = nx.grid_2d_graph(6, 6)
+        for radius in (0, 2):
+            inc = StableLayout(G, {node: node for node in G}, radius=radius)
+            self._check(*inc.remove_edge((2, 2), (2, 3)))
+            self._check(*inc.remove_edge((0, 0), (0, 1)))
+            self.assertFalse(inc.G.has_edge((0, 0), (0, 1)))
+            self._check(*inc.add_edge((2, 2), (2, 3)))
+            self._check(*inc.add_edge((0, 0), (0, 1), {(0, 0): (0, 0)}))
+            self.assertEqual(set(inc.input.edges), set(G.edges))
+
+    def test_error(self):  # only infeasible pinned flows make the region grow
+        G = nx.grid_2d_graph(4, 4)
+        inc = StableLayout(G, {node: node for node in G}, uselp=True)
+        inc.solver = "no such solver"
+        with self.assertRaisesRegex(Exception, "Unknown LP solver") as caught:
+            inc.remove_edge((1, 1), (1, 2))
+        self.assertNotIsInstance(caught.exception, InfeasibleError)
+
+
+class TestInstrument(unittest.TestCase):
+    def test_collector(self):
+        G = nx.Graph(nx.read_gml("test/inputs/case4.gml"))
+        pos = {node: eval(node) for node in G}
+        for uselp in (False, True):
+            finished = []
+            collector = Collector(finished.append)
+            H, _ = ortho_layout(G, pos, uselp=uselp, collector=collector)
+            records = {r["stage"]: r for r in collector.records}
+            self.assertEqual(len(finished), len(collector.records))
+            self.assertEqual(records["planarization"]["vertices"], len(G))
+            self.assertEqual(records["compaction.bend_points"]["bends"], len(H) - len(G))
+            solve = records["orthogonalization.solve"]
+            self.assertEqual(solve["status"], "optimal")
+            if uselp:
+                self.assertGreater(records["orthogonalization.lp_model"]["variables"], 0)
+            else:
+                self.assertEqual(solve["objective"], len(H) - len(G))  # one unit per bend
+            for r in collector.records:
+                self.assertGreaterEqual(r["wall"], 0)
+
+    def test_error(self):
+        collector = Collector()
+        with self.assertRaises(Exception):
+            ortho_layout(nx.complete_graph(5), collector=collector)
+        self.assertIn("error", collector.records[0])
+
+    def test_memory(self):
+        peaks, layouts = {}, {}
+        for low_memory in (False, True):
+            G = nx.grid_2d_graph(20, 20)
+            collector = Collector(memory=True)
+            H, layouts[low_memory] = ortho_layout(G, {node: node for node in G}, uselp=False,
+                                                  collector=collector, low_memory=low_memory)
+            collector.close()
+            self.assertEqual(H is G, low_memory)  # the input becomes the result
+            records = {r["stage"]: r for r in collector.records}
+            for stage, r in records.items():
+                self.assertGreater(r["peak_memory"], 0)
+                if "." in stage:
+                    self.assertLessEqual(r["peak_memory"], records[stage.split(".")[0]]["peak_memory"])
+            peaks[low_memory] = max(collector.peaks().values())
+        self.assertEqual(layouts[True], layouts[False])
+        self.assertLess(peaks[True], peaks[False])
+
+
+class TestImport(unittest.TestCase):
+    def test_headless(self):  # plotting and LP packages load only when used
+        code = ("import sys, networkx as nx, tsmpy; tsmpy.ortho_layout(nx.cycle_graph(4), uselp=False); "
+                "print(sorted(m for m in ('matplotlib', 'pulp', 'scipy', 'highspy') if m in sys.modules))")
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.strip(), "[]")
+
+
+class TestExport(unittest.TestCase):
+    def test_export(self):
+        G = nx.Graph(nx.read_gml("test/inputs/case4.gml"))
+        H, pos = ortho_layout(G, {node: eval(node) for node in G}, uselp=True)
+        self.assertTrue(any(is_bendnode(node) for node in H))
+
+        out = io.StringIO()
+        write_json(H, pos, out)
+        data = json.loads(out.getvalue())
+        self.assertEqual({node["id"] for node in data["nodes"]}, set(G))
+        self.assertEqual({frozenset((e["source"], e["target"])) for e in data["edges"]},
+                         {frozenset(e) for e in G.edges})
+        for e in data["edges"]:
+            points = e["points"]
+            self.assertEqual(tuple(points[0]), pos[e["source"]])
+            self.assertEqual(tuple(points[-1]), pos[e["target"]])
+            for (x1, y1), (x2, y2) in zip(points, points[1:]):
+                self.assertTrue(x1 == x2 or y1 == y2)
+
+        out = io.StringIO()
+        write_svg(H, pos, out)
+        svg = ET.fromstring(out.getvalue())
+        ns = "{http://www.w3.org/2000/svg}"
+        self.assertEqual(len(svg.findall(f".//{ns}polyline")), G.number_of_edges())
+        self.assertEqual(len(svg.findall(f".//{ns}circle")), len(G))
+        TSM(G, {node: eval(node) for node in G}).write_svg("test/outputs/case4.native.svg")
+
+
+class TestRoutes(unittest.TestCase):
+    @staticmethod
+    def routes_of(G, H, pos):
+        paths = {(u, v): points for u, v, points in edge_paths(H, pos)}
+        return {(u, v): paths[u, v] if (u, v) in paths else paths[v, u][::-1] for u, v in G.edges}
 
+    def test_routes(self):
+        G = nx.Graph(nx.read_gml("test/inputs/case4.gml"))
+        pos = {node: eval(node) for node in G}
+        for kw in (dict(uselp=True), dict(uselp=False, compact=True),
+                   dict(uselp=False, compaction="longest_path")):
+            H, layout = ortho_layout(G, pos, **kw)
+            nodes, edges = set(G), set(G.edges)
+            routes_pos, routes = ortho_layout(G, pos, routes=True, **kw)
+            self.assertEqual((set(G), set(G.edges)), (nodes, edges))  # G is left alone
+            self.assertEqual(routes_pos, {node: layout[node] for node in G})
+            self.assertEqual(list(routes), list(G.edges))
+            self.assertEqual(routes, self.routes_of(G, H, layout))
+            if kw["uselp"]:
+                self.assertTrue(any(len(points) > 2 for points in routes.values()))
+
+    def test_components_and_crossings(self):
+        G = nx.disjoint_union_all([nx.complete_graph(5), nx.path_graph(3), nx.cycle_graph(4)])
+        for workers in (1, 2):
+            H, pos = ortho_layout(G, uselp=False, planarize=True, workers=workers)
+            pos_routes = ortho_layout(G, uselp=False, planarize=True, workers=workers, routes=True)
+            self.assertEqual(pos_routes, ({node: pos[node] for node in G}, self.routes_of(G, H, pos)))
+
+
+class TestCLI(unittest.TestCase):
+    def test_jsonl(self):
+        grid = nx.grid_2d_graph(3, 3)
+        records = [
+            {"id": "grid", "nodes": [{"id": list(n), "x": n[0], "y": n[1]} for n in grid],
+             "edges": [[list(u), list(v)] for u, v in grid.edges]},
+            {"id": "k5", "edges": [list(e) for e in nx.complete_graph(5).edges]},  # not planar
+            {"edges": [[0, 1], [1, 2], [2, 3], [3, 0]]},
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "in.jsonl")
+            with open(source, "w") as f:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+                f.write("not json\n")
+            for workers in (1, 2):
+                output, log = os.path.join(tmp, "out.jsonl"), os.path.join(tmp, "log.jsonl")
+                status = cli.main([source, "-o", output, "--log", log, "--workers", str(workers)])
+                self.assertEqual(status, 1)
+                with open(output) as f:
+                    results = [json.loads(line) for line in f]
+                with open(log) as f:
+                    entries = [json.loads(line) for line in f]
+                self.assertEqual([r["id"] for r in results], ["grid", f"{source}:3"])
+                expected = ortho_layout(grid, {n: n for n in grid}, uselp=False)[1]
+                self.assertEqual({tuple(n["id"]): (n["x"], n["y"]) for n in results[0]["nodes"]},
+                                 {n: expected[n] for n in grid})
+                errors = {e["id"] for e in entries if e["error"]}
+                self.assertEqual(errors, {"k5", f"{source}:4"})
+                self.assertEqual(len(entries), 4)
+
+            # the output is valid input, and GML files are read with their positions
+            process = subprocess.run(
+                [sys.executable, "-m", "tsmpy", "-", "test/inputs/case2.gml", "--planarize"],
+                input="".join(json.dumps(r) + "\n" for r in records[1:] + results),
+                capture_output=True, text=True)
+            self.assertEqual(process.returncode, 0)
+            self.assertEqual([json.loads(line)["id"] for line in process.stdout.splitlines()],
+                             ["k5", "-:2", "grid", f"{source}:3", "test/inputs/case2.gml"])
+        G = nx.Graph(nx.read_gml("test/inputs/case2.gml"))
+        (_, H, pos), = cli.read_records(["test/inputs/case2.gml"])
+        self.assertEqual(ortho_layout(H, pos)[1], ortho_layout(G, {n: eval(n) for n in G})[1])
+
+    def test_missing(self):  # logged like a bad record, the other files are read
+        with tempfile.TemporaryDirectory() as tmp:
+            source, missing = os.path.join(tmp, "in.jsonl"), os.path.join(tmp, "no.jsonl")
+            with open(source, "w") as f:
+                f.write(json.dumps({"id": "c4", "edges": [[0, 1], [1, 2], [2, 3], [3, 0]]}) + "\n")
+            output, log = os.path.join(tmp, "out.jsonl"), os.path.join(tmp, "log.jsonl")
+            self.assertEqual(cli.main([missing, source, "-o", output, "--log", log]), 1)
+            with open(output) as f:
+                self.assertEqual([json.loads(line)["id"] for line in f], ["c4"])
+            with open(log) as f:
+                entries = {e["id"]: e["error"] for e in map(json.loads, f)}
+            self.assertTrue(entries[missing].startswith("FileNotFoundError"))
+            self.assertIsNone(entries["c4"])
+
+    def test_precheck(self):  # invalid input is logged with the reason
+        records = [
+            {"id": "loop", "edges": [[0, 1], [1, 1], [1, 2], [2, 0]]},
+            {"id": "star", "edges": [[0, i] for i in range(1, 6)]},
+            {"id": "k5", "edges": [list(e) for e in nx.complete_graph(5).edges]},
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "in.jsonl")
+            with open(source, "w") as f:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+            for workers in (1, 2):
+                output, log = os.path.join(tmp, "out.jsonl"), os.path.join(tmp, "log.jsonl")
+                cli.main([source, "-o", output, "--log", log, "--workers", str(workers)])
+                with open(log) as f:
+                    entries = {e["id"]: e["error"] for e in map(json.loads, f)}
+                self.assertEqual(entries, {
+                    "loop": "Exception: G contains selfloop",
+                    "star": "Exception: Max node degree larger than 4, "
+                            "which is not supported currently",
+                    "k5": "Exception: G is not a planar graph"})
+
+
+class TestArrays(unittest.TestCase):
+    def test_arrays(self):
+        G = nx.Graph(nx.read_gml("test/inputs/case4.gml"))
+        H, pos = ortho_layout(G, {node: eval(node) for node in G}, uselp=True)
+        arrays = layout_arrays(H, pos)
+        self.assertEqual(arrays.coords.shape, (len(H), 2))
+        self.assertEqual(arrays.edges.shape, (H.number_of_edges(), 2))
+        self.assertEqual(arrays.bends.tolist(), [is_bendnode(node) for node in arrays.nodes])
+        self.assertEqual(arrays.to_pos(), pos)
+        ends = arrays.coords[arrays.edges]  # every edge is axis-parallel
+        self.assertTrue(((ends[:, 0] == ends[:, 1]).any(axis=1)).all())
+        self.assertEqual(layout_arrays(nx.Graph(), {}).coords.shape, (0, 2))
+
+
+class TestPostcheck(unittest.TestCase):
+    def test_valid(self):
+        for i in (1, 3, 6):
+            G = nx.Graph(nx.read_gml(f"test/inputs/case{i}.gml"))
+            self.assertTrue(postcheck(*ortho_layout(G, {node: eval(node) for node in G})).ok)
+        G = nx.grid_2d_graph(30, 30)
+        self.assertTrue(postcheck(G, {node: node for node in G}).ok)
+        self.assertTrue(postcheck(nx.Graph(), {}).ok)
+
+    def test_invalid(self):
+        G = nx.Graph([(0, 1), (2, 3), (4, 5), (6, 7), (8, 9)])
+        pos = {0: (0, 0), 1: (4, 0),  # crossed by 2-3, overlapped by 4-5
+               2: (2, -1), 3: (2, 1),
+               4: (3, 0), 5: (6, 0),
+               6: (10, 10), 7: (11, 12),  # diagonal
+               8: (6, 0), 9: (6, -3)}  # 8 at the position of 5, touching 4-5
+        report = postcheck(G, pos)
+        self.assertFalse(report.ok)
+        self.assertEqual(report.diagonal_edges, [(6, 7)])
+        self.assertEqual(report.coincident_nodes, [[5, 8]])
+        self.assertEqual(report.overlapping_edges, [((0, 1), (4, 5))])
+        self.assertEqual({frozenset(pair) for pair in report.crossing_edges},
+                         {frozenset([(0, 1), (2, 3)]), frozenset([(4, 5), (8, 9)])})
+        self.assertEqual(len(report.crossing_edges), 2)
+
+class TestPlanarize(unittest.TestCase):
+    def check(self, G, pos=None, **kw):
+        H, pos = ortho_layout(G, pos, planarize=True, **kw)
+        self.assertFalse(any(isinstance(node, tuple) and node[0] == "crossing" for node in H))
+        report = postcheck(H, pos)
+        self.assertFalse(report.diagonal_edges or report.coincident_nodes or report.overlapping_edges)
+        self.assertEqual({frozenset((u, v)) for u, v, _ in edge_paths(H, pos)},
+                         {frozenset(e) for e in G.edges})
+        return report
+
+    def test_planar_subgraph(self):
+        for G, removed in ((nx.complete_graph(5), 1), (nx.complete_bipartite_graph(3, 3), 1),
+                           (nx.petersen_graph(), 2)):
+            H, rest = planar_subgraph(G)
+            self.assertTrue(nx.check_planarity(H)[0])
+            self.assertEqual(len(rest), removed)
+            self.assertEqual(H.number_of_edges() + len(rest), G.number_of_edges())
+
+    def test_crossings(self):
+        for G in (nx.complete_graph(5), nx.complete_bipartite_graph(3, 3), nx.petersen_graph()):
+            for uselp in (False, True):
+                for compact in (False, True):
+                    report = self.check(G, uselp=uselp, compact=compact)
+                    self.assertTrue(report.crossing_edges)
+
+    def test_pos(self):
+        G = nx.Graph([((0, 0), (2, 0)), ((2, 0), (2, 2)), ((2, 2), (0, 2)), ((0, 2), (0, 0)),
+                      ((0, 2), (0, 4)), ((0, 4), (2, 4)), ((2, 4), (2, 2)),
+                      ((0, 0), (2, 2)), ((2, 0), (0, 2))])
+        pos = {node: node for node in G}  # the square at the bottom drawn with both diagonals
+        self.check(G, pos)
+        H, _, ext = planarize(G, pos)
+        self.assertTrue(nx.check_planarity(H)[0])
+        self.assertLessEqual(len(H), len(G) + 1)  # the diagonal may go around instead
+        self.assertTrue(H.has_edge(*ext))
+
+    def test_planar(self):
+        G = nx.Graph(nx.read_gml("test/inputs/case1.gml"))
+        pos = {node: eval(node) for node in G}
+        self.assertEqual(ortho_layout(G, pos, planarize=True)[1], ortho_layout(G, pos)[1])
 
 if __name__ == '__main__':
     unittest.main(verbosity=3, exit=False)
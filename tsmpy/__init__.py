@@ -1 +1,9 @@
 from .tsm.tsm import TSM, ortho_layout, is_bendnode, precheck
+from .tsm.batch import ortho_layout_many
+from .tsm.cache import LayoutCache
+from .tsm.stable import StableLayout
+from .tsm.instrument import Collector
+from .tsm.mincostflow import InfeasibleError
+from .tsm.export import write_svg, write_json
+from .tsm.arrays import LayoutArrays, layout_arrays
+from .tsm.check import LayoutReport, postcheck
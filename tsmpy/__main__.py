@@ -0,0 +1,4 @@
+import sys
+from .tsm.cli import main
+
+sys.exit(main())
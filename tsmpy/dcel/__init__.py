@@ -1 +1,3 @@
 from .dcel import Dcel
+from .compact import CompactDcel
+from .rotation import RotationSystem
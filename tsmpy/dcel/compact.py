@@ -0,0 +1,522 @@
+"""Array-backed DCEL.
+
+Vertices, half-edges and faces are dense integers. Topology is kept in
+parallel arrays, and the objects handed out by ``vertices``, ``half_edges``
+and ``faces`` are light handles that read and write those arrays, so code
+written against :class:`Dcel` runs unchanged.
+
+A handle is an ``int`` subclass holding its own index, so creating, hashing
+and comparing handles runs at C speed. Each CompactDcel binds its own handle
+subclasses, which reach the arrays through the class attribute ``dcel``.
+Handles of different kinds or of different DCELs are not meant to be mixed.
+"""
+from array import array
+from collections.abc import MutableMapping
+from .dcel import Dcel
+from .rotation import RotationSystem
+
+NIL = -1
+
+
+def _index(ref):
+    return NIL if ref is None else ref
+
+
+class VertexRef(int):
+    __slots__ = ()
+    dcel = None
+
+    @property
+    def idx(self):
+        return int(self)
+
+    @property
+    def id(self):
+        return self.dcel.v_name[self]
+
+    @property
+    def inc(self):  # 'the first outgoing incident half-edge'
+        i = self.dcel.v_inc[self]
+        return None if i == NIL else self.dcel.half_edge_ref(i)
+
+    @inc.setter
+    def inc(self, he):
+        self.dcel.v_inc[self] = _index(he)
+
+    def surround_faces(self):  # clockwise, duplicated
+        for he in self.surround_half_edges():
+            yield he.inc
+
+    def surround_half_edges(self):  # clockwise
+        dcel = self.dcel
+        twin, prev, ref = dcel.he_twin, dcel.he_prev, dcel.half_edge_ref
+        first = dcel.v_inc[self]
+        yield ref(first)
+        i = twin[prev[first]]
+        while i != first:
+            yield ref(i)
+            i = twin[prev[i]]
+
+    def get_half_edge(self, face):
+        he_inc = self.dcel.he_inc
+        for he in self.surround_half_edges():
+            if he_inc[he] == face:
+                return he
+        raise Exception("not find")
+
+    def __bool__(self):
+        return True
+
+    def __repr__(self):
+        return f'{self.id}'
+
+
+class HalfEdgeRef(int):
+    __slots__ = ()
+    dcel = None
+
+    @property
+    def idx(self):
+        return int(self)
+
+    @property
+    def id(self):
+        dcel = self.dcel
+        return dcel.v_name[dcel.he_ori[self]], dcel.v_name[dcel.he_dst[self]]
+
+    @property
+    def inc(self):  # the incident face at its right hand
+        i = self.dcel.he_inc[self]
+        return None if i == NIL else self.dcel.face_ref(i)
+
+    @inc.setter
+    def inc(self, face):
+        self.dcel.he_inc[self] = _index(face)
+
+    @property
+    def twin(self):
+        i = self.dcel.he_twin[self]
+        return None if i == NIL else self.__class__(i)
+
+    @twin.setter
+    def twin(self, he):
+        self.dcel.he_twin[self] = _index(he)
+
+    @property
+    def ori(self):
+        i = self.dcel.he_ori[self]
+        return None if i == NIL else self.dcel.vertex_ref(i)
+
+    @ori.setter
+    def ori(self, vertex):
+        self.dcel.he_ori[self] = _index(vertex)
+
+    @property
+    def prev(self):
+        i = self.dcel.he_prev[self]
+        return None if i == NIL else self.__class__(i)
+
+    @prev.setter
+    def prev(self, he):
+        self.dcel.he_prev[self] = _index(he)
+
+    @property
+    def succ(self):
+        i = self.dcel.he_succ[self]
+        return None if i == NIL else self.__class__(i)
+
+    @succ.setter
+    def succ(self, he):
+        self.dcel.he_succ[self] = _index(he)
+
+    def set(self, twin, ori, prev, succ, inc):
+        dcel = self.dcel
+        dcel.he_twin[self] = _index(twin)
+        dcel.he_ori[self] = _index(ori)
+        dcel.he_prev[self] = _index(prev)
+        dcel.he_succ[self] = _index(succ)
+        dcel.he_inc[self] = _index(inc)
+
+    def traverse(self):
+        succ, ref = self.dcel.he_succ, self.__class__
+        yield self
+        i = succ[self]
+        while i != self:
+            yield ref(i)
+            i = succ[i]
+
+    def __bool__(self):
+        return True
+
+    def __repr__(self) -> str:
+        u, v = self.id
+        return f'{u}->{v}'
+
+
+class FaceRef(int):
+    __slots__ = ()
+    dcel = None
+
+    @property
+    def idx(self):
+        return int(self)
+
+    @property
+    def id(self):
+        return self.dcel.f_name[self]
+
+    @id.setter
+    def id(self, name):
+        self.dcel.f_name[self] = name
+
+    @property
+    def inc(self):  # the first half-edge incident to the face from left
+        i = self.dcel.f_inc[self]
+        return None if i == NIL else self.dcel.half_edge_ref(i)
+
+    @inc.setter
+    def inc(self, he):
+        self.dcel.f_inc[self] = _index(he)
+
+    @property
+    def is_external(self):
+        return bool(self.dcel.f_external[self])
+
+    @is_external.setter
+    def is_external(self, value):
+        self.dcel.f_external[self] = bool(value)
+
+    @property
+    def size(self):  # number of half-edges around, kept up to date by Dcel
+        return self.dcel.f_size[self]
+
+    @size.setter
+    def size(self, value):
+        self.dcel.f_size[self] = value
+
+    def __len__(self):
+        return self.dcel.f_size[self]
+
+    def __bool__(self):
+        return True
+
+    def __repr__(self) -> str:
+        return str(self.id)
+
+    def surround_faces(self):  # clockwise, duplicated!!
+        for he in self.surround_half_edges():
+            yield he.twin.inc
+
+    def surround_half_edges(self):  # clockwise
+        yield from self.inc.traverse()
+
+    def surround_vertices(self):
+        for he in self.surround_half_edges():
+            yield he.ori
+
+
+class _View(MutableMapping):
+    """Map names to handles. Only the name -> index table is stored."""
+
+    def __init__(self, make_ref):
+        self.index = {}
+        self._make_ref = make_ref
+
+    def __getitem__(self, key):
+        return self._make_ref(self.index[key])
+
+    def __setitem__(self, key, ref):
+        self.index[key] = int(ref)
+
+    def __delitem__(self, key):
+        del self.index[key]
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def values(self):
+        make_ref = self._make_ref
+        return (make_ref(i) for i in self.index.values())
+
+    def items(self):
+        make_ref = self._make_ref
+        return ((k, make_ref(i)) for k, i in self.index.items())
+
+
+class _HalfEdgeView(_View):
+    """Map (u, v) node names to half-edge handles, keyed internally by vertex indices."""
+
+    def __init__(self, dcel):
+        super().__init__(dcel.half_edge)
+        self._dcel = dcel
+        self._vertex_index = dcel.vertices.index
+
+    def _key(self, key):
+        u, v = key
+        vertex_index = self._vertex_index
+        return vertex_index[u] << 32 | vertex_index[v]
+
+    def __getitem__(self, key):
+        try:
+            return self._make_ref(self.index[self._key(key)])
+        except (KeyError, TypeError, ValueError):
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, ref):
+        self.index[self._key(key)] = int(ref)
+
+    def __delitem__(self, key):
+        try:
+            del self.index[self._key(key)]
+        except (KeyError, TypeError, ValueError):
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        try:
+            return self._key(key) in self.index
+        except (KeyError, TypeError, ValueError):
+            return False
+
+    def __iter__(self):
+        v_name = self._dcel.v_name
+        for key in list(self.index):
+            yield v_name[key >> 32], v_name[key & 0xFFFFFFFF]
+
+    def items(self):
+        make_ref = self._make_ref
+        return ((ref.id, ref) for ref in map(make_ref, self.index.values()))
+
+
+class HalfEdgeColumn(MutableMapping):
+    """Per-half-edge attribute stored as an array column indexed by half-edge"""
+
+    def __init__(self, dcel, typecode='q'):
+        self._dcel = dcel
+        self._values = array(typecode)
+        self._present = bytearray()
+        self._len = 0
+
+    def __getitem__(self, he):
+        if he < len(self._present) and self._present[he]:
+            return self._values[he]
+        raise KeyError(he)
+
+    def __setitem__(self, he, value):
+        i = he
+        if i >= len(self._present):
+            grow = len(self._dcel.he_ori) - len(self._present)
+            self._values.extend([0] * grow)
+            self._present.extend(bytes(grow))
+        if not self._present[i]:
+            self._present[i] = 1
+            self._len += 1
+        self._values[i] = value
+
+    def __delitem__(self, he):
+        if he >= len(self._present) or not self._present[he]:
+            raise KeyError(he)
+        self._present[he] = 0
+        self._len -= 1
+
+    def __contains__(self, he):
+        return he < len(self._present) and self._present[he] == 1
+
+    def __iter__(self):
+        ref = self._dcel.half_edge_ref
+        for i, present in enumerate(self._present):
+            if present:
+                yield ref(i)
+
+    def __len__(self):
+        return self._len
+
+    def indexed_items(self):
+        """Yield (half-edge index, value), without creating handles"""
+        values = self._values
+        for i, present in enumerate(self._present):
+            if present:
+                yield i, values[i]
+
+    def items(self):
+        ref, values = self._dcel.half_edge_ref, self._values
+        return ((ref(i), values[i])
+                for i, present in enumerate(self._present) if present)
+
+
+class CompactDcel(Dcel):
+    """
+    Array-backed variant of Dcel for large graphs.
+    Works best when nodes are dense integers, see ortho_layout(compact=True).
+    """
+
+    def __init__(self, G, embedding):
+        # handle classes bound to this DCEL
+        self.vertex_ref = type('VertexRef', (VertexRef,), {'__slots__': (), 'dcel': self})
+        self.half_edge_ref = type('HalfEdgeRef', (HalfEdgeRef,), {'__slots__': (), 'dcel': self})
+        self.face_ref = type('FaceRef', (FaceRef,), {'__slots__': (), 'dcel': self})
+
+        self.vertices = _View(self.vertex)
+        self.half_edges = _HalfEdgeView(self)
+        self.faces = _View(self.face)
+        self.ext_face = None
+
+        # build plain lists first, arrays are filled once at the end
+        self.v_name = v_name = list(G.nodes)
+        vertex_index = self.vertices.index
+        vertex_index.update((node, i) for i, node in enumerate(v_name))
+        v_inc = [NIL] * len(v_name)
+        he_ori, he_dst, he_twin = [], [], []
+        he_index = self.half_edges.index
+        for u, v in G.edges:
+            iu, iv = vertex_index[u], vertex_index[v]
+            he = len(he_ori)
+            he_ori += (iu, iv)
+            he_dst += (iv, iu)
+            he_twin += (he + 1, he)
+            he_index[iu << 32 | iv] = he
+            he_index[iv << 32 | iu] = he + 1
+            v_inc[iu] = he
+            v_inc[iv] = he + 1
+
+        # half-edge (u, v) is followed by (v, w) in its face
+        he_prev = [NIL] * len(he_ori)
+        if isinstance(embedding, RotationSystem):  # numbered in the same order
+            he_succ = list(embedding.succ)
+            for he, succ in enumerate(he_succ):
+                he_prev[succ] = he
+        else:
+            he_succ = [NIL] * len(he_ori)
+            next_face_half_edge = embedding.next_face_half_edge
+            for he, (iu, iv) in enumerate(zip(he_ori, he_dst)):
+                _, w = next_face_half_edge(v_name[iu], v_name[iv])
+                succ = he_index[iv << 32 | vertex_index[w]]
+                he_succ[he] = succ
+                he_prev[succ] = he
+
+        he_inc = [NIL] * len(he_ori)
+        f_name, f_inc, f_size = [], [], []
+        face_index = self.faces.index
+        for he in range(len(he_ori)):
+            if he_inc[he] == NIL:
+                face = len(f_name)
+                f_name.append(("face", face))
+                f_inc.append(he)
+                face_index[f_name[face]] = face
+                e, size = he, 0
+                while True:
+                    he_inc[e] = face
+                    size += 1
+                    e = he_succ[e]
+                    if e == he:
+                        break
+                f_size.append(size)
+
+        self.v_inc = array('i', v_inc)
+        self.he_ori = array('i', he_ori)
+        self.he_dst = array('i', he_dst)
+        self.he_twin = array('i', he_twin)
+        self.he_prev = array('i', he_prev)
+        self.he_succ = array('i', he_succ)
+        self.he_inc = array('i', he_inc)
+        self.f_name = f_name
+        self.f_inc = array('i', f_inc)
+        self.f_size = array('i', f_size)
+        self.f_external = bytearray(len(f_name))
+
+    def face_degrees(self):
+        f_name, f_size, f_external = self.f_name, self.f_size, self.f_external
+        for f in self.faces.index.values():
+            yield f_name[f], f_size[f], bool(f_external[f])
+
+    def corners(self):
+        v_name, v_inc, f_name = self.v_name, self.v_inc, self.f_name
+        he_twin, he_prev, he_inc, he_dst = self.he_twin, self.he_prev, self.he_inc, self.he_dst
+        for v in self.vertices.index.values():
+            name = v_name[v]
+            first = he = v_inc[v]
+            while True:
+                yield name, f_name[he_inc[he]], (name, v_name[he_dst[he]])
+                he = he_twin[he_prev[he]]
+                if he == first:
+                    break
+
+    def dual_edges(self):
+        v_name, f_name = self.v_name, self.f_name
+        he_ori, he_dst, he_twin, he_inc = self.he_ori, self.he_dst, self.he_twin, self.he_inc
+        for he in self.half_edges.index.values():
+            yield (f_name[he_inc[he_twin[he]]], f_name[he_inc[he]],
+                   (v_name[he_ori[he]], v_name[he_dst[he]]))
+
+    def half_edge_records(self, half_edge_map):
+        if not isinstance(half_edge_map, HalfEdgeColumn):
+            yield from super().half_edge_records(half_edge_map)
+            return
+        v_name, f_name, f_external = self.v_name, self.f_name, self.f_external
+        he_ori, he_dst, he_twin, he_inc = self.he_ori, self.he_dst, self.he_twin, self.he_inc
+        ref = self.half_edge_ref
+        for he, value in half_edge_map.indexed_items():
+            rf = he_inc[he]
+            yield (ref(he), value, f_name[he_inc[he_twin[he]]], f_name[rf],
+                   bool(f_external[rf]), (v_name[he_ori[he]], v_name[he_dst[he]]))
+
+    def face_cycle(self, he):
+        # half-edges are yielded as plain indices, which key HalfEdgeColumn
+        # and are accepted back by face_cycle and vertex_star
+        v_name, f_name = self.v_name, self.f_name
+        he_ori, he_dst, he_twin, he_inc, he_succ = \
+            self.he_ori, self.he_dst, self.he_twin, self.he_inc, self.he_succ
+        first = e = int(he)
+        while True:
+            yield e, he_twin[e], v_name[he_ori[e]], v_name[he_dst[e]], f_name[he_inc[e]]
+            e = he_succ[e]
+            if e == first:
+                break
+
+    def vertex_star(self, he):
+        v_name, f_name = self.v_name, self.f_name
+        he_ori, he_dst, he_twin, he_inc, he_prev = \
+            self.he_ori, self.he_dst, self.he_twin, self.he_inc, self.he_prev
+        first = e = self.v_inc[he_ori[he]]
+        while True:
+            yield e, he_twin[e], v_name[he_ori[e]], v_name[he_dst[e]], f_name[he_inc[e]]
+            e = he_twin[he_prev[e]]
+            if e == first:
+                break
+
+    def vertex(self, idx):
+        return None if idx == NIL else self.vertex_ref(idx)
+
+    def half_edge(self, idx):
+        return None if idx == NIL else self.half_edge_ref(idx)
+
+    def face(self, idx):
+        return None if idx == NIL else self.face_ref(idx)
+
+    def _new_vertex(self, name):
+        self.v_name.append(name)
+        self.v_inc.append(NIL)
+        return self.vertex_ref(len(self.v_name) - 1)
+
+    def _new_half_edge(self, u, v):
+        vertex_index = self.vertices.index
+        self.he_ori.append(vertex_index[u])
+        self.he_dst.append(vertex_index[v])
+        for column in (self.he_twin, self.he_prev, self.he_succ, self.he_inc):
+            column.append(NIL)
+        return self.half_edge_ref(len(self.he_ori) - 1)
+
+    def _new_face(self, name):
+        self.f_name.append(name)
+        self.f_inc.append(NIL)
+        self.f_size.append(0)
+        self.f_external.append(0)
+        return self.face_ref(len(self.f_name) - 1)
+
+    def half_edge_map(self):
+        return HalfEdgeColumn(self)
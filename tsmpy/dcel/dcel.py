@@ -4,6 +4,7 @@ It is a data structure to represent an embedding of a planar graph in the plane
 from .face import Face
 from .halfedge import HalfEdge
 from .vertex import Vertex
+from .rotation import RotationSystem
 
 
 class Dcel:
@@ -21,10 +22,11 @@ class Dcel:
         self.faces = {}
         self.ext_face = None
 
-        self.vertices = {node: Vertex(node) for node in G.nodes}
+        for node in G.nodes:
+            self.vertices[node] = self._new_vertex(node)
 
         def add_half_edge(u, v):
-            he = HalfEdge(u, v)
+            he = self._new_half_edge(u, v)
             self.half_edges[u, v] = he
             if (v, u) in self.half_edges:
                 he.twin = self.half_edges[v, u]
@@ -36,23 +38,79 @@ class Dcel:
             add_half_edge(u, v)
             add_half_edge(v, u)
 
-        for (u, v), he in self.half_edges.items():
-            he.succ = self.half_edges[embedding.next_face_half_edge(u, v)]
-            he.succ.prev = he
+        if isinstance(embedding, RotationSystem):  # numbered in the same order
+            hes = list(self.half_edges.values())
+            for he, succ in zip(hes, embedding.succ):
+                he.succ = hes[succ]
+                he.succ.prev = he
+        else:
+            for (u, v), he in self.half_edges.items():
+                he.succ = self.half_edges[embedding.next_face_half_edge(u, v)]
+                he.succ.prev = he
 
         for (u, v), he in self.half_edges.items():
-            if not he.inc:
-                face = Face(("face", len(self.faces)))
+            if he.inc is None:
+                face = self._new_face(("face", len(self.faces)))
                 self.faces[face.id] = face
                 face.inc = he
                 for e in he.traverse():
                     e.inc = face
+                    face.size += 1
+
+    def _new_vertex(self, name):
+        return Vertex(name)
+
+    def _new_half_edge(self, u, v):
+        return HalfEdge(u, v)
+
+    def _new_face(self, name):
+        return Face(name)
+
+    def half_edge_map(self):
+        """Return an empty mapping keyed by half-edge, for per-half-edge attributes"""
+        return {}
+
+    def face_degrees(self):
+        """Yield (face id, number of half-edges, is_external) for every face"""
+        for face in self.faces.values():
+            yield face.id, face.size, face.is_external
+
+    def corners(self):
+        """Yield (vertex id, face id, half-edge id) for every half-edge,
+        grouped by vertex, clockwise around it
+        """
+        for vertex in self.vertices.values():
+            for he in vertex.surround_half_edges():
+                yield vertex.id, he.inc.id, he.id
+
+    def dual_edges(self):
+        """Yield (left face id, right face id, half-edge id) for every half-edge"""
+        for he in self.half_edges.values():
+            yield he.twin.inc.id, he.inc.id, he.id
+
+    def half_edge_records(self, half_edge_map):
+        """Yield (he, value, left face id, right face id, right face is external,
+        half-edge id) for every half-edge in half_edge_map
+        """
+        for he, value in half_edge_map.items():
+            rf = he.inc
+            yield he, value, he.twin.inc.id, rf.id, rf.is_external, he.id
+
+    def face_cycle(self, he):
+        """Yield (he, twin, ori id, twin ori id, face id) along the face of he"""
+        for e in he.traverse():
+            yield e, e.twin, e.ori.id, e.twin.ori.id, e.inc.id
+
+    def vertex_star(self, he):
+        """Yield (he, twin, ori id, twin ori id, face id) clockwise around he.ori"""
+        for e in he.ori.surround_half_edges():
+            yield e, e.twin, e.ori.id, e.twin.ori.id, e.inc.id
 
     def add_node_between(self, u, node_name, v):
         def insert_node(u, v, mi):
             he = self.half_edges.pop((u, v))
-            he1 = HalfEdge(u, mi.id)
-            he2 = HalfEdge(mi.id, v)
+            he1 = self._new_half_edge(u, mi.id)
+            he2 = self._new_half_edge(mi.id, v)
             mi.inc = he2
             # update half_edges
             self.half_edges[u, mi.id] = he1
@@ -62,14 +120,15 @@ class Dcel:
             he1.prev.succ = he1
             he2.succ.prev = he2
             # update face
-            if he.inc.inc is he:
+            he.inc.size += 1
+            if he.inc.inc == he:
                 he.inc.inc = he1
             # update vertex
-            if he.ori.inc is he:
+            if he.ori.inc == he:
                 he.ori.inc = he1
 
         # update vertices
-        mi = Vertex(node_name)
+        mi = self._new_vertex(node_name)
         self.vertices[node_name] = mi
         # insert
         insert_node(u, v, mi)
@@ -78,21 +137,53 @@ class Dcel:
             self.half_edges[v1, v2].twin = self.half_edges[v2, v1]
             self.half_edges[v2, v1].twin = self.half_edges[v1, v2]
 
+    def add_border(self, nodes, face, outer_face_id):
+        """Surround the embedding with a cycle through nodes.
+        The inner side of the cycle joins face, the outer side becomes a new face
+        named outer_face_id. Return the inner half-edges in traversal order.
+        """
+        n = len(nodes)
+        for node in nodes:
+            self.vertices[node] = self._new_vertex(node)
+        outer = self._new_face(outer_face_id)
+        self.faces[outer_face_id] = outer
+
+        inner_hes = [self._new_half_edge(nodes[i], nodes[(i + 1) % n])
+                     for i in range(n)]
+        outer_hes = [self._new_half_edge(nodes[(i + 1) % n], nodes[i])
+                     for i in range(n)]
+        for he, twin in zip(inner_hes, outer_hes):
+            self.half_edges[he.id] = he
+            self.half_edges[twin.id] = twin
+        for i in range(n):
+            he, twin = inner_hes[i], outer_hes[i]
+            he.set(twin, self.vertices[nodes[i]],
+                   inner_hes[i - 1], inner_hes[(i + 1) % n], face)
+            twin.set(he, self.vertices[nodes[(i + 1) % n]],
+                     outer_hes[(i + 1) % n], outer_hes[i - 1], outer)
+            he.ori.inc = he
+        outer.inc = outer_hes[0]
+        outer.size = n
+        face.size += n
+        return inner_hes
+
     def connect(self, face: Face, u, v, half_edge_side, side_uv):  # u, v in same face
         def insert_half_edge(u, v, f, prev_he, succ_he):
-            he = HalfEdge(u, v)
+            he = self._new_half_edge(u, v)
             self.half_edges[u, v] = he
             f.inc = he
             he.set(None, self.vertices[u], prev_he, succ_he, f)
             prev_he.succ = he
             succ_he.prev = he
             self.faces[f.id] = f
+            f.size = 0
             for h in he.traverse():
                 h.inc = f
+                f.size += 1
 
         # It's true only if G is connected.
-        face_l = Face(('face', *face.id[1:], 'l'))
-        face_r = Face(('face', *face.id[1:], 'r'))
+        face_l = self._new_face(('face', *face.id[1:], 'l'))
+        face_r = self._new_face(('face', *face.id[1:], 'r'))
 
         if face.is_external:
             face_r.is_external = True
@@ -132,7 +223,7 @@ class Dcel:
         assert type(v) != Vertex
 
         def insert_half_edge(u, v, f, prev_he, succ_he):
-            he = HalfEdge(u, v)
+            he = self._new_half_edge(u, v)
             self.half_edges[u, v] = he
             he.set(None, self.vertices[u], prev_he, succ_he, f)
             prev_he.succ = he
@@ -146,5 +237,6 @@ class Dcel:
 
         insert_half_edge(u, v, face, prev_uv, succ_uv)
         insert_half_edge(v, u, face, prev_vu, succ_vu)
+        face.size += 2
         self.half_edges[u, v].twin = self.half_edges[v, u]
         self.half_edges[v, u].twin = self.half_edges[u, v]
@@ -1,11 +1,17 @@
 class Face:
+    __slots__ = ('id', 'inc', 'is_external', 'size')
+
     def __init__(self, name):
         self.id = name
         self.inc = None  # the first half-edge incident to the face from left
         self.is_external = False
+        self.size = 0  # number of half-edges around, kept up to date by Dcel
 
     def __len__(self):
-        return len(list(self.surround_vertices()))
+        return self.size
+
+    def __bool__(self):
+        return True
 
     def __repr__(self) -> str:
         return str(self.id)
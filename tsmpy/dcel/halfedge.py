@@ -1,4 +1,6 @@
 class HalfEdge:
+    __slots__ = ('id', 'inc', 'twin', 'ori', 'prev', 'succ')
+
     def __init__(self, u, v):
         self.id = (u, v)
         self.inc = None  # the incident face at its right hand
@@ -0,0 +1,25 @@
+class RotationSystem:
+    """
+    Faces of an embedding given by the half-edge following each half-edge.
+    Half-edges are numbered as the DCELs create them: 2i is the i-th edge
+    (u, v) of G.edges, 2i + 1 is its twin (v, u). succ[h] is the half-edge
+    after h in its face, that is (v, w) with w the neighbor after u
+    counterclockwise around v.
+    Build it with tsm.utils.rotation_system.
+    """
+
+    def __init__(self, G, succ):
+        self.edges = list(G.edges)
+        self.succ = succ
+        self._index = None
+
+    def next_face_half_edge(self, u, v):
+        """As networkx.PlanarEmbedding.next_face_half_edge"""
+        if self._index is None:
+            self._index = {}
+            for i, (a, b) in enumerate(self.edges):
+                self._index[a, b] = 2 * i
+                self._index[b, a] = 2 * i + 1
+        h = self.succ[self._index[u, v]]
+        a, b = self.edges[h >> 1]
+        return (a, b) if h & 1 == 0 else (b, a)
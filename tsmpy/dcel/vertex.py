@@ -1,4 +1,6 @@
 class Vertex:
+    __slots__ = ('id', 'inc')
+
     def __init__(self, name):
         self.id = name
         self.inc = None  # 'the first outgoing incident half-edge'
@@ -0,0 +1,49 @@
+"""Layouts as NumPy arrays, for vectorized work on the result.
+
+    arrays = layout_arrays(*ortho_layout(G, pos))
+    arrays.coords * 20                # scale, an (N, 2) integer array
+    arrays.coords[arrays.edges]       # (M, 2, 2) segment end points
+    arrays.coords[~arrays.bends]      # positions of the input nodes
+
+numpy is optional, it is imported when an array layout is built.
+"""
+from collections import namedtuple
+from .batch import pack_layout
+from .tsm import is_bendnode
+
+__all__ = ["LayoutArrays", "layout_arrays"]
+
+
+class LayoutArrays(namedtuple("LayoutArrays", ["nodes", "coords", "edges", "bends"])):
+    """A layout in array form.
+
+    nodes : list
+        node names, row i of coords and index i in edges is nodes[i]
+
+    coords : (N, 2) int64 array
+        x, y of every node
+
+    edges : (M, 2) int array
+        node indices of the ends of every edge
+
+    bends : (N,) bool array
+        True for bend nodes
+    """
+    __slots__ = ()
+
+    def to_pos(self):
+        """The layout as ortho_layout's pos dict"""
+        return {node: (x, y) for node, (x, y) in zip(self.nodes, self.coords.tolist())}
+
+
+def layout_arrays(G, pos):
+    """Convert the (G, pos) returned by ortho_layout to LayoutArrays"""
+    import numpy as np
+
+    nodes, edges, coords = pack_layout(G, pos)  # flat machine arrays, no copy below
+    return LayoutArrays(
+        nodes,
+        np.frombuffer(coords, dtype=np.int64).reshape(-1, 2),
+        np.frombuffer(edges, dtype=np.intc).reshape(-1, 2),
+        np.fromiter(map(is_bendnode, nodes), dtype=bool, count=len(nodes)),
+    )
@@ -0,0 +1,193 @@
+"""Lay out many independent graphs on a process pool.
+
+Graphs travel to the workers and back as a node list plus flat integer
+arrays (edges as node indices, coordinates in node order) rather than as
+pickled networkx objects. Only the topology is sent, node and edge
+attributes are not.
+"""
+from array import array
+from functools import partial
+import pickle
+import threading
+import time
+import networkx as nx
+
+__all__ = ["ortho_layout_many"]
+
+
+def pack_graph(G, pos=None):
+    """Encode G and pos as (nodes, edges, coords).
+    edges holds node indices in pairs, coords holds x, y in node order.
+    """
+    nodes = list(G)
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = array('i')
+    for u, v in G.edges:
+        edges.append(index[u])
+        edges.append(index[v])
+    coords = None
+    if pos is not None:
+        coords = array('d')
+        for node in nodes:
+            coords.extend(pos[node])
+    return nodes, edges, coords
+
+
+def unpack_graph(nodes, edges, coords):
+    """Inverse of pack_graph"""
+    G = nx.Graph()
+    G.add_nodes_from(nodes)
+    G.add_edges_from((nodes[edges[i]], nodes[edges[i + 1]])
+                     for i in range(0, len(edges), 2))
+    pos = None
+    if coords is not None:
+        pos = {node: (coords[2 * i], coords[2 * i + 1])
+               for i, node in enumerate(nodes)}
+    return G, pos
+
+
+def pack_layout(G, pos):
+    """Encode a layout as (nodes, edges, coords), see pack_graph"""
+    nodes, edges, _ = pack_graph(G)
+    coords = array('q')  # layouts are on the integer grid
+    for node in nodes:
+        coords.extend(pos[node])
+    return nodes, edges, coords
+
+
+def unpack_layout(packed):
+    """Inverse of pack_layout"""
+    nodes, edges, coords = packed
+    G, pos = unpack_graph(nodes, edges, None)
+    return G, {node: (coords[2 * i], coords[2 * i + 1]) for i, node in enumerate(nodes)}
+
+
+def _portable(error):
+    """The exception itself if it survives pickling, otherwise a plain copy"""
+    try:
+        pickle.loads(pickle.dumps(error))
+        return error
+    except Exception:
+        return Exception(f"{type(error).__name__}: {error}")
+
+
+def _layout_chunk(chunk, memory=False, check=False, **options):
+    from .tsm import ortho_layout, precheck
+    from .instrument import Collector
+
+    results = []
+    for i, packed in chunk:
+        stats = {}
+        if memory:
+            options["collector"] = collector = Collector(memory=True)
+        start = time.perf_counter()
+        try:
+            G, pos = unpack_graph(*packed)
+            if check:  # crossings are not looked for in a trusted embedding
+                precheck(G, pos, planarize=options.get("planarize", False)
+                         or not options.get("check_embedding", True))
+            G, pos = ortho_layout(G, pos, **options)
+            result = i, pack_layout(G, pos), None, stats
+        except Exception as e:
+            result = i, None, _portable(e), stats
+        stats["seconds"] = time.perf_counter() - start
+        if memory:
+            collector.close()
+            stats["peak_memory"] = collector.peaks()
+        results.append(result)
+    return results
+
+
+def _chunks(layouts, chunksize, pending=None):
+    """Pack (G, pos) pairs into chunks of (i, packed). With a semaphore as
+    pending, one is acquired before every chunk
+    """
+    chunk = []
+    for i, (G, pos) in enumerate(layouts):
+        chunk.append((i, pack_graph(G, pos)))
+        if len(chunk) == chunksize:
+            if pending is not None:
+                pending.acquire()
+            yield chunk
+            chunk = []
+    if chunk:
+        if pending is not None:
+            pending.acquire()
+        yield chunk
+
+
+def _layout_many(layouts, workers=None, chunksize=1, ordered=True, max_pending=None, memory=False,
+                 check=False, **options):
+    """ortho_layout_many over an iterable of (G, pos) pairs, yielding
+    (i, layout, error, stats). stats has the "seconds" spent on the graph
+    and, with memory, the "peak_memory" of every stage, see Collector.
+    With check, every graph goes through precheck first, in the worker.
+
+    A pool reads its input as fast as it can, so at most max_pending
+    chunks are read ahead of the results taken from here. The input is
+    then read as the results are consumed, in constant memory.
+    """
+    if chunksize < 1:
+        raise Exception("chunksize must be at least 1")
+    task = partial(_layout_chunk, memory=memory, check=check, **options)
+
+    if workers is not None and workers <= 1:
+        for chunk in _chunks(layouts, chunksize):
+            for i, packed, error, stats in task(chunk):
+                yield i, None if packed is None else unpack_layout(packed), error, stats
+        return
+
+    from multiprocessing import Pool
+
+    pending = None if max_pending is None else threading.Semaphore(max_pending)
+    chunks = _chunks(layouts, chunksize, pending)
+    with Pool(workers) as pool:
+        results = pool.imap(task, chunks) if ordered else pool.imap_unordered(task, chunks)
+        for chunk_results in results:
+            if pending is not None:
+                pending.release()
+            for i, packed, error, stats in chunk_results:
+                yield i, None if packed is None else unpack_layout(packed), error, stats
+
+
+def ortho_layout_many(graphs, positions=None, workers=None, chunksize=1, ordered=True,
+                      uselp=True, compact=False, solver="auto", compaction="flow",
+                      check_embedding=True, planarize=False, low_memory=False):
+    """Run ortho_layout on every graph, in worker processes.
+
+    Parameters
+    ----------
+    graphs : iterable of networkx graphs
+
+    positions : sequence of dicts, optional
+        initial positions, positions[i] for graphs[i], None entries allowed
+
+    workers : int
+        number of processes, os.cpu_count() if None. With 1 or less the
+        graphs are laid out in the calling process.
+
+    chunksize : int
+        number of graphs sent to a worker at a time
+
+    ordered : bool
+        yield results in input order, otherwise as soon as they are done
+
+    uselp, compact, solver, compaction, check_embedding, planarize, low_memory
+        passed to ortho_layout
+
+    Yields
+    ------
+    i, layout, error
+        layout is ortho_layout's (G, pos) for graphs[i], or None when it
+        raised, in which case error is the exception. A failing graph does
+        not stop the others.
+    """
+    if positions is None:
+        layouts = ((G, None) for G in graphs)
+    else:
+        layouts = ((G, positions[i]) for i, G in enumerate(graphs))
+    for i, layout, error, _ in _layout_many(
+            layouts, workers, chunksize, ordered, uselp=uselp, compact=compact, solver=solver,
+            compaction=compaction, check_embedding=check_embedding, planarize=planarize,
+            low_memory=low_memory):
+        yield i, layout, error
@@ -0,0 +1,139 @@
+"""Content-addressed cache of layouts.
+
+A layout is determined by the graph, the embedding of its initial positions
+(the cyclic order of neighbours around every node, and the external face)
+and the solver options, so these are what the key is hashed from. Positions
+that only move nodes without changing the embedding share an entry.
+"""
+from collections import OrderedDict
+from hashlib import sha256
+import os
+import pickle
+import tempfile
+import networkx as nx
+from .batch import pack_layout, unpack_layout
+from .planarization import external_half_edge
+from .utils import neighbors_ccw
+
+__all__ = ["LayoutCache", "layout_key"]
+
+
+def _rotated(names):
+    """names rotated to start at the smallest, a canonical cyclic order"""
+    if not names:
+        return names
+    k = names.index(min(names))
+    return names[k:] + names[:k]
+
+
+def layout_key(G, pos=None, **options):
+    """Hex digest identifying the layout of G with initial positions pos"""
+    nodes = sorted(repr(node) for node in G)
+    edges = sorted(tuple(sorted((repr(u), repr(v)))) for u, v in G.edges)
+    rotation = external = None
+    if pos is not None:
+        # the rotation system convert_pos_to_embedding builds
+        rotation = sorted((repr(node), _rotated([repr(v) for v in neighbors_ccw(G, pos, node)]))
+                          for node in G)
+        external = sorted(
+            tuple(map(repr, external_half_edge(G, {node: pos[node] for node in component})))
+            for component in nx.connected_components(G) if len(component) > 1)
+    content = (nodes, edges, rotation, external, sorted(options.items()))
+    return sha256(repr(content).encode()).hexdigest()
+
+
+def _with_data(G, H):
+    """The layout graph H, stored without data, as ortho_layout returns it:
+    of the class of G, with its graph, node and edge data
+    """
+    R = G.__class__()
+    R.graph.update(G.graph)
+    R.add_nodes_from((node, G.nodes[node] if node in G else {}) for node in H)
+    R.add_edges_from((u, v, G.edges[u, v] if G.has_edge(u, v) else {}) for u, v in H.edges)
+    return R
+
+
+class LayoutCache:
+    """Layouts kept in memory, least recently used evicted first, and
+    optionally in a directory which several processes may share.
+
+    Parameters
+    ----------
+    maxsize : int
+        number of layouts kept in memory
+
+    directory : str, optional
+        where layouts are persisted, one file per key
+    """
+
+    def __init__(self, maxsize=128, directory=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".pickle")
+
+    def get(self, key):
+        """Return the layout (G, pos) stored for key, or None"""
+        packed = self.entries.get(key)
+        if packed is not None:
+            self.entries.move_to_end(key)
+        elif self.directory is not None:
+            try:
+                with open(self._path(key), "rb") as f:
+                    packed = pickle.load(f)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                return None
+            self._remember(key, packed)
+        if packed is None:
+            return None
+        return unpack_layout(packed)
+
+    def put(self, key, G, pos):
+        packed = pack_layout(G, pos)
+        self._remember(key, packed)
+        if self.directory is not None:
+            # write then rename, so readers never see a partial file
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(packed, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+
+    def _remember(self, key, packed):
+        self.entries[key] = packed
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        """Forget the layouts in memory, the directory is left alone"""
+        self.entries.clear()
+
+    def ortho_layout(self, G, init_pos=None, uselp=True, compact=False, solver="auto", workers=1,
+                     compaction="flow", check_embedding=True, planarize=False, low_memory=False):
+        """ortho_layout, looked up in the cache first. Only the layout is
+        stored, a hit takes the data of its graph from G
+        """
+        from .tsm import ortho_layout
+
+        key = layout_key(G, init_pos, uselp=uselp, compact=compact, solver=solver,
+                         compaction=compaction, planarize=planarize)
+        layout = self.get(key)
+        if layout is not None:
+            self.hits += 1
+            H, pos = layout
+            return _with_data(G, H), pos
+        self.misses += 1
+        G, pos = ortho_layout(G, init_pos, uselp, compact, solver, workers,
+                              compaction=compaction, check_embedding=check_embedding,
+                              planarize=planarize, low_memory=low_memory)
+        self.put(key, G, pos)
+        return G, pos
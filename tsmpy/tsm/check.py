@@ -0,0 +1,182 @@
+"""Check a finished layout with array operations.
+
+    report = postcheck(G, pos)
+    if not report.ok:
+        print(report.crossing_edges)
+
+Every edge must be horizontal or vertical, no two nodes may share a
+position, and edges may only meet at a common node. Everything is found in
+one pass of sorts and searches over the whole layout, no pair of edges is
+tested in Python. numpy is imported when a check runs.
+"""
+from collections import namedtuple
+from itertools import chain
+from .arrays import LayoutArrays
+from .tsm import is_bendnode
+
+__all__ = ["LayoutReport", "postcheck", "check_arrays"]
+
+
+class LayoutReport(namedtuple("LayoutReport", [
+        "diagonal_edges", "coincident_nodes", "overlapping_edges", "crossing_edges"])):
+    """Problems found in a layout, every field is a list.
+
+    diagonal_edges : [(u, v)]
+        edges which are neither horizontal nor vertical
+
+    coincident_nodes : [[node, ...]]
+        groups of nodes at the same position
+
+    overlapping_edges : [((u, v), (w, x))]
+        collinear edges sharing more than a point
+
+    crossing_edges : [((u, v), (w, x))]
+        a horizontal and a vertical edge without a common node that meet
+    """
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return not any(self)
+
+
+def _expand(counts):
+    """For counts[i] items of every i, the i of each item and its rank within i"""
+    import numpy as np
+
+    owner = np.repeat(np.arange(len(counts)), counts)
+    rank = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, rank
+
+
+def _overlaps(line, lo, hi):
+    """Pairs (i, j) of intervals [lo, hi] on the same line which share more
+    than a point, by one sort on (line, lo)
+    """
+    import numpy as np
+
+    n = len(line)
+    values, ranks = np.unique(np.concatenate([lo, hi]), return_inverse=True)
+    _, lines = np.unique(line, return_inverse=True)
+    # integer keys ordering by line, then by position on the line
+    lines = lines.reshape(-1).astype(np.int64) * (len(values) + 1)
+    ranks = ranks.reshape(-1)
+    key_lo, key_hi = lines + ranks[:n], lines + ranks[n:]
+    order = np.argsort(key_lo, kind="stable")
+    key_lo, key_hi = key_lo[order], key_hi[order]
+    # the intervals after i that start before it ends
+    end = np.searchsorted(key_lo, key_hi, side="left")
+    first, rank = _expand(np.maximum(end - np.arange(n) - 1, 0))
+    second = first + 1 + rank
+    keep = key_lo[first] < key_hi[second]  # not only touching at the start of first
+    return order[first[keep]], order[second[keep]]
+
+
+def _crossings(hx0, hx1, hy, vx, vy0, vy1, origin):
+    """Pairs (h, v) of a horizontal and a vertical segment that meet.
+
+    Segments are put in the cells of a uniform grid they cover, sorted by
+    cell, and only segments in a common cell are paired. A horizontal and
+    a vertical segment share at most one cell, so no pair comes twice.
+    """
+    import numpy as np
+
+    x0, y0 = origin
+    cell = float(np.concatenate([hx1 - hx0, vy1 - vy0]).mean()) or 1.0
+
+    def cells(lo, hi, offset):
+        return (((lo - offset) // cell).astype(np.int64),
+                ((hi - offset) // cell).astype(np.int64))
+
+    # a few long segments could cover too many cells, coarsen the grid then
+    while True:
+        hc0, hc1 = cells(hx0, hx1, x0)
+        vr0, vr1 = cells(vy0, vy1, y0)
+        if (hc1 - hc0 + 1).sum() + (vr1 - vr0 + 1).sum() <= 8 * (len(hy) + len(vx)):
+            break
+        cell *= 2
+    hr = ((hy - y0) // cell).astype(np.int64)
+    vc = ((vx - x0) // cell).astype(np.int64)
+    width = int(max(hc1.max(), vc.max())) + 1
+
+    h, rank = _expand(hc1 - hc0 + 1)
+    h_cell = hr[h] * width + hc0[h] + rank
+    v, rank = _expand(vr1 - vr0 + 1)
+    v_cell = (vr0[v] + rank) * width + vc[v]
+
+    order = np.argsort(v_cell, kind="stable")
+    v, v_cell = v[order], v_cell[order]
+    lo = np.searchsorted(v_cell, h_cell, side="left")
+    hi = np.searchsorted(v_cell, h_cell, side="right")
+    item, rank = _expand(hi - lo)
+    h, v = h[item], v[lo[item] + rank]
+
+    meet = ((hx0[h] <= vx[v]) & (vx[v] <= hx1[h])
+            & (vy0[v] <= hy[h]) & (hy[h] <= vy1[v]))
+    return h[meet], v[meet]
+
+
+def check_arrays(arrays):
+    """Check a layout given as LayoutArrays, return a LayoutReport"""
+    import numpy as np
+
+    nodes, coords, edges = arrays.nodes, arrays.coords, arrays.edges
+    edge_list = None
+
+    def named(indices):
+        nonlocal edge_list
+        if not len(indices):
+            return []
+        if edge_list is None:
+            edge_list = [(nodes[u], nodes[v]) for u, v in edges.tolist()]
+        return [edge_list[i] for i in indices.tolist()]
+
+    ends = coords[edges]
+    xa, ya, xb, yb = ends[:, 0, 0], ends[:, 0, 1], ends[:, 1, 0], ends[:, 1, 1]
+    horizontal = ya == yb  # a zero length edge is taken as horizontal
+    vertical = (xa == xb) & ~horizontal
+    diagonal = np.flatnonzero(~(horizontal | vertical))
+
+    coincident = []
+    if len(coords):
+        _, inverse, counts = np.unique(coords, axis=0, return_inverse=True, return_counts=True)
+        inverse = inverse.reshape(-1)
+        shared = np.flatnonzero(counts[inverse] > 1)
+        if len(shared):
+            shared = shared[np.argsort(inverse[shared], kind="stable")]
+            groups = np.split(shared, np.flatnonzero(np.diff(inverse[shared])) + 1)
+            coincident = [[nodes[i] for i in group.tolist()] for group in groups]
+
+    H = np.flatnonzero(horizontal)
+    V = np.flatnonzero(vertical)
+    hx0, hx1, hy = np.minimum(xa[H], xb[H]), np.maximum(xa[H], xb[H]), ya[H]
+    vy0, vy1, vx = np.minimum(ya[V], yb[V]), np.maximum(ya[V], yb[V]), xa[V]
+
+    overlapping = []
+    for indices, line, lo, hi in ((H, hy, hx0, hx1), (V, vx, vy0, vy1)):
+        if len(indices) > 1:
+            i, j = _overlaps(line, lo, hi)
+            overlapping.extend(zip(named(indices[i]), named(indices[j])))
+
+    crossing = []
+    if len(H) and len(V):
+        h, v = _crossings(hx0, hx1, hy, vx, vy0, vy1, coords.min(axis=0))
+        h, v = H[h], V[v]
+        (a, b), (c, d) = edges[h].T, edges[v].T
+        apart = (a != c) & (a != d) & (b != c) & (b != d)  # edges at a common node meet there
+        crossing = list(zip(named(h[apart]), named(v[apart])))
+
+    return LayoutReport(named(diagonal), coincident, overlapping, crossing)
+
+
+def postcheck(G, pos):
+    """Check the layout of G, return a LayoutReport instead of raising"""
+    import numpy as np
+
+    nodes = list(G)
+    index = {node: i for i, node in enumerate(nodes)}
+    coords = np.array([pos[node] for node in nodes]).reshape(-1, 2)
+    edges = np.fromiter(map(index.__getitem__, chain.from_iterable(G.edges())),
+                        dtype=np.intp, count=2 * G.number_of_edges()).reshape(-1, 2)
+    bends = np.fromiter(map(is_bendnode, nodes), dtype=bool, count=len(nodes))
+    return check_arrays(LayoutArrays(nodes, coords, edges, bends))
@@ -0,0 +1,204 @@
+"""Lay out a stream of graphs from the command line.
+
+    tsmpy graphs.jsonl --output layouts.jsonl --log log.jsonl --workers 4
+    tsmpy test/inputs/*.gml --uselp
+    cat graphs.jsonl | tsmpy - > layouts.jsonl
+
+Every input record is a JSON object on one line,
+
+    {"id": "a", "nodes": [{"id": 1, "x": 0, "y": 0}, ...], "edges": [[1, 2], ...]}
+
+nodes may also be plain ids, edges may be {"source": u, "target": v}
+objects, so the output of one run can be read again. Positions are used
+when every node has x and y. JSON lists in ids become tuples. A GML file
+holds one graph, positioned by the x and y of its nodes' graphics, as
+written by yEd.
+
+Every layout is written as one line in the format of write_json, with
+the id of its record, as soon as it is done. Errors and the seconds taken
+by every record go to the log as JSON lines {"id", "seconds", "error"},
+with --memory also the peak bytes of every stage, {"peak_memory": {stage:
+bytes}}, to size workers by. Records go through precheck first, so the
+log gives the reason invalid input is rejected. Input is read as results
+are written, memory does not grow with it.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import networkx as nx
+from .batch import _layout_many
+from .export import edge_paths
+from .tsm import is_bendnode
+
+__all__ = ["read_records", "layout_record", "main"]
+
+
+def _hashable(value):
+    if isinstance(value, list):
+        return tuple(map(_hashable, value))
+    return value
+
+
+def _graph_from_json(record):
+    G = nx.Graph()
+    pos = {}
+    for node in record.get("nodes", ()):
+        if isinstance(node, dict):
+            name = _hashable(node["id"])
+            if "x" in node and "y" in node:
+                pos[name] = (node["x"], node["y"])
+        else:
+            name = _hashable(node)
+        G.add_node(name)
+    for edge in record["edges"]:
+        if isinstance(edge, dict):
+            edge = edge["source"], edge["target"]
+        u, v = edge
+        G.add_edge(_hashable(u), _hashable(v))
+    return G, pos if pos and len(pos) == len(G) else None
+
+
+def _graph_from_gml(path):
+    G = nx.Graph(nx.read_gml(path))
+    pos = {}
+    for node, graphics in G.nodes(data="graphics"):
+        if graphics and "x" in graphics and "y" in graphics:
+            pos[node] = (graphics["x"], graphics["y"])
+    return G, pos if len(pos) == len(G) else None
+
+
+def read_records(files, format=None, errors=None):
+    """Yield (id, G, pos) from JSONL or GML files, "-" for stdin.
+    format is "jsonl" or "gml", taken from the file extension if None.
+    A record which can't be read is passed to errors(id, exception) and
+    skipped, when errors is given.
+    """
+    for path in files:
+        kind = format or ("gml" if path.lower().endswith(".gml") else "jsonl")
+        if kind == "gml":
+            try:
+                G, pos = _graph_from_gml(sys.stdin.buffer if path == "-" else path)
+            except Exception as e:
+                if errors is None:
+                    raise
+                errors(path, e)
+                continue
+            yield path, G, pos
+            continue
+        try:
+            f = sys.stdin if path == "-" else open(path)
+        except OSError as e:
+            if errors is None:
+                raise
+            errors(path, e)
+            continue
+        try:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                name = f"{path}:{line_number}"
+                try:
+                    record = json.loads(line)
+                    name = record.get("id", name)
+                    G, pos = _graph_from_json(record)
+                except Exception as e:
+                    if errors is None:
+                        raise
+                    errors(name, e)
+                    continue
+                yield name, G, pos
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+
+def layout_record(name, G, pos):
+    """The layout as a dict in the format of write_json, with "id" name"""
+    return {
+        "id": name,
+        "nodes": [{"id": node, "x": pos[node][0], "y": pos[node][1]}
+                  for node in G if not is_bendnode(node)],
+        "edges": [{"source": u, "target": v, "points": [list(p) for p in points]}
+                  for u, v, points in edge_paths(G, pos)],
+    }
+
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog="tsmpy", description="Orthogonal layouts of graphs read from JSONL or GML files.")
+    parser.add_argument("files", nargs="*", default=["-"],
+                        help="input files, - for stdin (default)")
+    parser.add_argument("--format", choices=["jsonl", "gml"],
+                        help="input format, by file extension if not given")
+    parser.add_argument("-o", "--output", default="-", help="output JSONL file, - for stdout")
+    parser.add_argument("--log", default="-", help="JSONL log of errors and timings, - for stderr")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes, 0 for one per CPU (default 1)")
+    parser.add_argument("--chunksize", type=int, default=1, help="graphs sent to a worker at a time")
+    parser.add_argument("--unordered", action="store_true",
+                        help="write layouts as they are done instead of in input order")
+    parser.add_argument("--uselp", action="store_true", help="minimize bends with the LP solver")
+    parser.add_argument("--solver", default="auto", choices=["auto", "highs", "scipy", "cbc"])
+    parser.add_argument("--compact", action="store_true", help="use the array-backed DCEL")
+    parser.add_argument("--compaction", default="flow", choices=["flow", "longest_path"])
+    parser.add_argument("--planarize", action="store_true",
+                        help="accept non-planar graphs, edges cross at right angles")
+    parser.add_argument("--no-check-embedding", dest="check_embedding", action="store_false",
+                        help="trust that the given positions have no crossing")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="free every stage's data as soon as the next has used it")
+    parser.add_argument("--memory", action="store_true",
+                        help="log the peak memory of every stage, slower")
+    return parser
+
+
+def main(argv=None):
+    """Entry point of the tsmpy command, return the exit status:
+    0 if every record was laid out, 1 otherwise
+    """
+    args = _parser().parse_args(argv)
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    log = sys.stderr if args.log == "-" else open(args.log, "w")
+    lock = threading.Lock()  # the pool reads the input, and logs its errors, in a thread
+    failed = False
+
+    def write_log(name, stats, error):
+        nonlocal failed
+        if error is not None:
+            failed = True
+            error = f"{type(error).__name__}: {error}"
+        entry = {"id": name, "seconds": stats.get("seconds"), "error": error}
+        if "peak_memory" in stats:
+            entry["peak_memory"] = stats["peak_memory"]
+        with lock:
+            log.write(json.dumps(entry, default=str) + "\n")
+            log.flush()
+
+    names = {}
+
+    def layouts():
+        for i, (name, G, pos) in enumerate(read_records(
+                args.files, args.format, lambda name, e: write_log(name, {}, e))):
+            names[i] = name
+            yield G, pos
+
+    workers = args.workers or os.cpu_count()
+    try:
+        for i, layout, error, stats in _layout_many(
+                layouts(), workers, args.chunksize, not args.unordered, max_pending=2 * workers,
+                memory=args.memory, check=True, uselp=args.uselp, compact=args.compact, solver=args.solver,
+                compaction=args.compaction, check_embedding=args.check_embedding,
+                planarize=args.planarize, low_memory=args.low_memory):
+            name = names.pop(i)
+            if layout is not None:
+                output.write(json.dumps(layout_record(name, *layout), default=str) + "\n")
+                output.flush()
+            write_log(name, stats, error)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if log is not sys.stderr:
+            log.close()
+    return 1 if failed else 0
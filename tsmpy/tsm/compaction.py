@@ -1,46 +1,99 @@
+from bisect import bisect_right
+from collections import deque
 from .flownet import FlowNet
-from tsmpy.dcel import Dcel
-import networkx as nx
+from .instrument import NULL_COLLECTOR
+
+TURNS = (0, 1, -2, -1)  # turn by the change of side, (next_side - side) % 4
+
+
+def is_crossing(node):
+    return type(node) is tuple and len(node) > 1 and node[0] == "crossing"
 
 
 class Compaction:
     """
     Assign minimum lengths to the segments of the edges of the orthogonal representation.
+
+    Parameters
+    ----------
+    method : str
+        "flow" minimizes the total edge length with two min-cost flows,
+        "longest_path" gives every horizontal and vertical segment the
+        smallest coordinate its neighbors allow, in linear time.
+
+    low_memory : bool
+        free the flow of ortho once the face sides are known, and the dcel,
+        of ortho too, once pos is computed. ortho can't be used again.
+
+    routes : bool
+        leave G as it is, bends and dummy nodes are only in the dcel. pos
+        is then given for the nodes of G, and self.routes maps every edge
+        of G without crossing nodes to its points, see edge_routes.
     """
 
-    def __init__(self, ortho):
+    def __init__(self, ortho, collector=NULL_COLLECTOR, method="flow", low_memory=False,
+                 routes=False):
+        if method not in ("flow", "longest_path"):
+            raise ValueError(f"unknown compaction method {method!r}")
         self.G = ortho.G
         self.dcel = ortho.dcel
+        self.collector = collector
+        self.edit_graph = not routes
+        self.bend_chains = {}  # (u, v) -> its bend nodes from u to v, for routes
+        self.routes = None
 
         flow_dict = ortho.flow_dict
-        self.bend_point_processor(flow_dict)
-        ori_edges = list(self.G.edges)
-        half_edge_side = self.face_side_processor(flow_dict)
-        self.refine_faces(half_edge_side)
-
-        half_edge_length = self.tidy_rectangle_compaction(half_edge_side)
-        self.pos = self.layout(half_edge_side, half_edge_length)
-        self.remove_dummy()
-        self.G.add_edges_from(ori_edges)
+        with collector.stage("compaction"):
+            with collector.stage("bend_points") as info:
+                info["bends"] = self.bend_point_processor(flow_dict)
+            ori_edges = list(self.G.edges) if self.edit_graph else None
+            with collector.stage("face_sides"):
+                half_edge_side = self.face_side_processor(flow_dict)
+            if low_memory:
+                ortho.flow_dict = flow_dict = None
+            with collector.stage("refine_faces") as info:
+                n = len(self.dcel.vertices)
+                self.refine_faces(half_edge_side)
+                info["dummies"] = len(self.dcel.vertices) - n
+                info["faces"] = len(self.dcel.faces)
+
+            if method == "flow":
+                half_edge_length = self.tidy_rectangle_compaction(half_edge_side)
+            else:
+                with collector.stage("longest_path") as info:
+                    half_edge_length = self.longest_path_compaction(half_edge_side, info)
+            with collector.stage("layout"):
+                self.pos = self.layout(half_edge_side, half_edge_length)
+                if self.edit_graph:
+                    self.remove_dummy()
+                    self.G.add_edges_from(ori_edges)
+                    self.remove_crossings()
+                else:
+                    self.routes = self.edge_routes()
+                    self.pos = {node: self.pos[node] for node in self.G if not is_crossing(node)}
+            if low_memory:
+                ortho.dcel = self.dcel = None
 
     def bend_point_processor(self, flow_dict):
-        """Create bend nodes. Modify self.G, self.dcel and flow_dict"""
+        """Create bend nodes. Modify self.G, self.dcel and flow_dict.
+        Return the number of bends
+        """
         bends = {}  # left to right
-        for he in self.dcel.half_edges.values():
-            lf, rf = he.twin.inc, he.inc
-            flow = flow_dict[lf.id][rf.id][he.id]
+        for lf_id, rf_id, he_id in self.dcel.dual_edges():
+            flow = flow_dict[lf_id][rf_id][he_id]
             if flow > 0:
-                bends[he] = flow
+                bends[he_id] = lf_id, rf_id, flow
 
         idx = 0
         # (u, v) -> (u, bend0, bend1, ..., v)
-        for he, num_bends in bends.items():
+        for (u, v), (lf_id, rf_id, num_bends) in bends.items():
             # Q: what if there are bends on both (u, v) and (v, u)?
             # A: Impossible, not a min cost
-            u, v = he.ori.id, he.twin.ori.id
-            lf_id, rf_id = he.twin.inc.id, he.inc.id
 
-            self.G.remove_edge(u, v)
+            if self.edit_graph:
+                self.G.remove_edge(u, v)
+            else:
+                self.bend_chains[u, v] = [('bend', idx + i) for i in range(num_bends)]
             # use ('bend', idx) to represent bend node
             flow_dict[u][rf_id][u,
                                 ('bend', idx)] = flow_dict[u][rf_id].pop((u, v))
@@ -49,7 +102,8 @@ class Compaction:
                 cur_node = ('bend', idx)
                 pre_node = ('bend', idx - 1) if i > 0 else u
                 nxt_node = ('bend', idx + 1) if i < num_bends - 1 else v
-                self.G.add_edge(pre_node, cur_node)
+                if self.edit_graph:
+                    self.G.add_edge(pre_node, cur_node)
                 self.dcel.add_node_between(
                     pre_node, cur_node, v
                 )
@@ -61,126 +115,162 @@ class Compaction:
 
             flow_dict[v][lf_id][v,
                                 ('bend', idx - 1)] = flow_dict[v][lf_id].pop((v, u))
-            self.G.add_edge(('bend', idx - 1), v)
+            if self.edit_graph:
+                self.G.add_edge(('bend', idx - 1), v)
+        return idx
 
     def refine_faces(self, half_edge_side):
         """Make face rectangle, create dummpy nodes.
         Modify self.G, self.dcel, half_edge_side
         """
 
-        def find_front(init_he, target):  # first
-            cnt = 0
-            for he in init_he.traverse():
-                side, next_side = half_edge_side[he], half_edge_side[he.succ]
-                if side == next_side:  # go straight
-                    pass
-                elif (side + 1) % 4 == next_side:  # go right
-                    cnt += 1
-                elif (side + 2) % 4 == next_side:  # go back
-                    cnt -= 2
-                else:  # go left
-                    cnt -= 1
-                if cnt == target:
-                    return he.succ
-            raise Exception(f"can't find front edge of {init_he}")
+        # turn at the corner of he and he.succ: 0 straight, 1 right, -1 left, -2 back
+        turn = self.dcel.half_edge_map()
 
-        def refine_internal(face):
-            """Insert only one edge to make face more rect"""
-            for he in face.surround_half_edges():
-                side, next_side = half_edge_side[he], half_edge_side[he.succ]
-                if side != next_side and (side + 1) % 4 != next_side:
-                    front_he = find_front(he, 1)
-                    extend_node_id = he.twin.ori.id
+        def set_turn(he):
+            turn[he] = TURNS[(half_edge_side[he.succ] - half_edge_side[he]) % 4]
 
-                    l, r = front_he.ori.id, front_he.twin.ori.id
-                    he_l2r = self.dcel.half_edges[l, r]
-                    dummy_node_id = ("dummy", extend_node_id)
+        renamed = {}  # removed half-edge -> the half-edge now starting its corner
+
+        def resolve(he):
+            while he in renamed:
+                he = renamed[he]
+            return he
+
+        def refine_internal(face):
+            """Insert edges from reflex corners until every face is a rectangle.
+
+            The face is scanned once. The front edge of a reflex corner is where
+            the sum of turns from it first reaches 1, found for every corner at
+            once from prefix sums. Splitting a face does not move the front of
+            a remaining corner to another edge of the original face, only to
+            another piece of it, so the sums stay valid.
+
+            corners holds the reflex corners in scan order, and each pending face
+            is a range of it. Splitting at the first corner of a range leaves the
+            corners before its front in the left face and the rest in the right
+            face. Left faces go first, as the dummy nodes created depend on the
+            order.
+            """
+            hes = list(face.surround_half_edges())
+            n = len(hes)
+            prefix = [0]  # prefix[i]: sum of turns at corners 0..i-1, twice round
+            for i in range(2 * n):
+                prefix.append(prefix[-1] + turn[hes[i % n]])
+            rise = {}  # i -> the first j > i with prefix[j] > prefix[i], which is prefix[i] + 1
+            stack = []
+            for j, value in enumerate(prefix):
+                while stack and prefix[stack[-1]] < value:
+                    rise[stack.pop()] = j
+                stack.append(j)
+
+            positions = [i for i in range(n) if turn[hes[i]] < 0]
+            corners = [hes[i] for i in positions]
+            stack = [(0, len(corners))]
+            while stack:
+                start, end = stack.pop()
+                if start == end:
+                    continue
+                he = resolve(corners[start])
+                i = positions[start]
+                if rise.get(i, 2 * n + 1) - i > n:
+                    raise Exception(f"can't find front edge of {he}")
+                last = rise[i] - 1  # the corner turning onto the front edge
+                k = bisect_right(positions, last, start + 1, end) - start - 1
+
+                # the piece of the front edge that is still in this face
+                front_he = resolve(hes[last % n]).succ
+                for _ in range(n):
+                    if front_he.inc == he.inc:
+                        break
+                    front_he = front_he.succ.twin.succ  # across a dummy node
+                else:
+                    raise Exception(f"can't find front edge of {he}")
+                extend_node_id = he.twin.ori.id
+
+                l, r = front_he.ori.id, front_he.twin.ori.id
+                he_l2r = self.dcel.half_edges[l, r]
+                he_r2l = he_l2r.twin
+                dummy_node_id = ("dummy", extend_node_id)
+                if self.edit_graph:
                     self.G.remove_edge(l, r)
                     self.G.add_edge(l, dummy_node_id)
                     self.G.add_edge(dummy_node_id, r)
-
-                    face = self.dcel.half_edges[l, r].inc
-                    self.dcel.add_node_between(l, dummy_node_id, r)
-                    he_l2d = self.dcel.half_edges[l, dummy_node_id]
-                    he_d2r = self.dcel.half_edges[dummy_node_id, r]
-                    half_edge_side[he_l2d] = half_edge_side[he_l2r]
-                    half_edge_side[he_l2d.twin] = (
-                        half_edge_side[he_l2r] + 2) % 4
-                    half_edge_side[he_d2r] = half_edge_side[he_l2r]
-                    half_edge_side[he_d2r.twin] = (
-                        half_edge_side[he_l2r] + 2) % 4
-                    half_edge_side.pop(he_l2r)
-                    half_edge_side.pop(he_l2r.twin)
-
                     self.G.add_edge(dummy_node_id, extend_node_id)
-                    self.dcel.connect(face, extend_node_id,
-                                      dummy_node_id, half_edge_side, half_edge_side[he])
 
-                    he_e2d = self.dcel.half_edges[extend_node_id,
-                                                  dummy_node_id]
-                    lf, rf = he_e2d.twin.inc, he_e2d.inc
-                    half_edge_side[he_e2d] = half_edge_side[he]
-                    half_edge_side[he_e2d.twin] = (half_edge_side[he] + 2) % 4
-
-                    refine_internal(lf)
-                    refine_internal(rf)
-                    break
-
-        def build_border(G, dcel, half_edge_side):
+                face = self.dcel.half_edges[l, r].inc
+                self.dcel.add_node_between(l, dummy_node_id, r)
+                he_l2d = self.dcel.half_edges[l, dummy_node_id]
+                he_d2r = self.dcel.half_edges[dummy_node_id, r]
+                half_edge_side[he_l2d] = half_edge_side[he_l2r]
+                half_edge_side[he_l2d.twin] = (
+                    half_edge_side[he_l2r] + 2) % 4
+                half_edge_side[he_d2r] = half_edge_side[he_l2r]
+                half_edge_side[he_d2r.twin] = (
+                    half_edge_side[he_l2r] + 2) % 4
+                half_edge_side.pop(he_l2r)
+                half_edge_side.pop(he_l2r.twin)
+
+                self.dcel.connect(face, extend_node_id,
+                                  dummy_node_id, half_edge_side, half_edge_side[he])
+
+                he_e2d = self.dcel.half_edges[extend_node_id,
+                                              dummy_node_id]
+                half_edge_side[he_e2d] = half_edge_side[he]
+                half_edge_side[he_e2d.twin] = (half_edge_side[he] + 2) % 4
+
+                # only corners touching the new half-edges have changed
+                turn.pop(he_l2r)
+                turn.pop(he_r2l)
+                for new_he in (he_l2d, he_d2r, he_l2d.twin, he_d2r.twin, he_e2d, he_e2d.twin):
+                    set_turn(new_he)
+                    set_turn(new_he.prev)
+                # corners at r and l, if pending in any face, now start from
+                # the new half-edges
+                renamed[he_l2r] = he_d2r
+                renamed[he_r2l] = he_l2d.twin
+                stack.append((start + k + 1, end))  # right face
+                stack.append((start + 1, start + k + 1))  # left face
+
+        def build_border(dcel, half_edge_side):
             """Create border dcel"""
             border_nodes = [("dummy", -i) for i in range(1, 5)]
             border_edges = [(border_nodes[i], border_nodes[(i + 1) % 4])
                             for i in range(4)]
-            border_G = nx.Graph(border_edges)
             border_side_dict = {}
-            is_planar, border_embedding = nx.check_planarity(border_G)
-            border_dcel = Dcel(border_G, border_embedding)
-            ext_face = border_dcel.half_edges[(
-                border_nodes[0], border_nodes[1])].twin.inc
-            border_dcel.ext_face = ext_face
-            ext_face.is_external = True
-
-            for face in list(border_dcel.faces.values()):
-                if not face.is_external:
-                    for i, he in enumerate(face.surround_half_edges()):
-                        he.inc = self.dcel.ext_face
-                        half_edge_side[he] = i  # assign side
-                        half_edge_side[he.twin] = (i + 2) % 4
-                        border_side_dict[i] = he
-                    border_dcel.faces.pop(face.id)
-                    border_dcel.faces[self.dcel.ext_face.id] = self.dcel.ext_face
-                else:
-                    # rename border_dcel.ext_face's name
-                    border_dcel.faces.pop(face.id)
-                    face.id = ("face", -1)
-                    border_dcel.faces[face.id] = face
-            G.add_edges_from(border_edges)
-
-            # merge border dcel into self.dcel
-            dcel.vertices.update(border_dcel.vertices)
-            dcel.half_edges.update(border_dcel.half_edges)
-            dcel.faces.update(border_dcel.faces)
+            inner_hes = dcel.add_border(
+                border_nodes, dcel.ext_face, ("face", -1))
+            for i, he in enumerate(inner_hes):
+                half_edge_side[he] = i  # assign side
+                half_edge_side[he.twin] = (i + 2) % 4
+                border_side_dict[i] = he
+            if self.edit_graph:
+                self.G.add_edges_from(border_edges)
+
             dcel.ext_face.is_external = False
-            dcel.ext_face = border_dcel.ext_face
+            dcel.ext_face = dcel.faces[("face", -1)]
+            dcel.ext_face.is_external = True
             return border_side_dict
 
         ori_ext_face = self.dcel.ext_face
-        border_side_dict = build_border(self.G, self.dcel, half_edge_side)
+        border_side_dict = build_border(self.dcel, half_edge_side)
 
         for he in ori_ext_face.surround_half_edges():
             extend_node_id = he.succ.ori.id
             side, next_side = half_edge_side[he], half_edge_side[he.succ]
             if next_side != side and next_side != (side + 1) % 4:
-                if len(self.G[extend_node_id]) <= 2:
+                extend_node = self.dcel.vertices[extend_node_id]
+                if sum(1 for _ in extend_node.surround_half_edges()) <= 2:
                     front_he = border_side_dict[(side + 1) % 4]
                     dummy_node_id = ("dummy", extend_node_id)
                     l, r = front_he.ori.id, front_he.twin.ori.id
                     he_l2r = self.dcel.half_edges[l, r]
                     # process G
-                    self.G.remove_edge(l, r)
-                    self.G.add_edge(l, dummy_node_id)
-                    self.G.add_edge(dummy_node_id, r)
-                    self.G.add_edge(dummy_node_id, extend_node_id)
+                    if self.edit_graph:
+                        self.G.remove_edge(l, r)
+                        self.G.add_edge(l, dummy_node_id)
+                        self.G.add_edge(dummy_node_id, r)
+                        self.G.add_edge(dummy_node_id, extend_node_id)
 
                     # # process dcel
 
@@ -208,6 +298,9 @@ class Compaction:
         else:
             raise Exception("not connected")
 
+        for face in self.dcel.faces.values():
+            for he in face.surround_half_edges():
+                set_turn(he)
         for face in list(self.dcel.faces.values()):
             if face.id != ("face", -1):
                 refine_internal(face)
@@ -215,12 +308,15 @@ class Compaction:
     def face_side_processor(self, flow_dict):
         """Give flow_dict, assign half_edges with face sides"""
 
-        half_edge_side = {}
+        half_edge_side = self.dcel.half_edge_map()
 
         def set_side(init_he, side):
-            for he in init_he.traverse():
+            """Assign sides around the face of init_he, return its half-edges"""
+            cycle = list(self.dcel.face_cycle(init_he))
+            # the angle between he and its successor (v, w) in face f
+            for (he, _, _, _, f), (_, _, v, w, _) in zip(cycle, cycle[1:] + cycle[:1]):
                 half_edge_side[he] = side
-                angle = flow_dict[he.succ.ori.id][he.inc.id][he.succ.id]
+                angle = flow_dict[v][f][v, w]
                 if angle == 1:
                     # turn right in internal face or turn left in external face
                     side = (side + 1) % 4
@@ -228,12 +324,20 @@ class Compaction:
                     side = (side + 3) % 4
                 elif angle == 4:  # a single edge
                     side = (side + 2) % 4
+            return iter(cycle)
+
+        # depth-first over faces with an explicit stack, each face is entered once
+        # through a twin. The order matches the former recursion, so the
+        # compaction flows see the half-edges in the same order.
+        stack = [set_side(self.dcel.ext_face.inc, 0)]
+        while stack:
+            for he, twin, _, _, _ in stack[-1]:
+                if twin not in half_edge_side:
+                    stack.append(set_side(twin, (half_edge_side[he] + 2) % 4))
+                    break
+            else:
+                stack.pop()
 
-            for he in init_he.traverse():
-                if he.twin not in half_edge_side:
-                    set_side(he.twin, (half_edge_side[he] + 2) % 4)
-
-        set_side(self.dcel.ext_face.inc, 0)
         return half_edge_side
 
     def tidy_rectangle_compaction(self, half_edge_side):
@@ -241,14 +345,16 @@ class Compaction:
         Compute every edge's length, depending on half_edge_side
         """
 
+        # (he, side, lf_id, rf_id, he_id), rf_id is ('face', 'end') for the external face
+        records = [(he, side, lf_id, ('face', 'end') if rf_is_external else rf_id, he_id)
+                   for he, side, lf_id, rf_id, rf_is_external, he_id
+                   in self.dcel.half_edge_records(half_edge_side)]
+
         def build_flow(target_side):
             flow = FlowNet()
-            for he, side in half_edge_side.items():
+            for he, side, lf_id, rf_id, he_id in records:
                 if side == target_side:
-                    lf, rf = he.twin.inc, he.inc
-                    lf_id = lf.id
-                    rf_id = rf.id if not rf.is_external else ('face', 'end')
-                    flow.add_edge(lf_id, rf_id, he.id)
+                    flow.add_edge(lf_id, rf_id, he_id)
             return flow
 
         def min_cost_flow(flow, source, sink):
@@ -271,54 +377,121 @@ class Compaction:
         hor_flow = build_flow(1)  # up -> bottom
         ver_flow = build_flow(0)  # left -> right
 
-        hor_flow_dict = min_cost_flow(
-            hor_flow, self.dcel.ext_face.id, ('face', 'end'))
-        ver_flow_dict = min_cost_flow(
-            ver_flow, self.dcel.ext_face.id, ('face', 'end'))
+        def solve(name, flow):
+            with self.collector.stage(name) as info:
+                flow_dict = min_cost_flow(flow, self.dcel.ext_face.id, ('face', 'end'))
+                info["nodes"] = flow.number_of_nodes()
+                info["arcs"] = flow.number_of_edges()
+                info["objective"] = getattr(flow, "cost", 0)  # no cost if empty
+            return flow_dict
 
-        half_edge_length = {}
+        hor_flow_dict = solve("horizontal_flow", hor_flow)
+        ver_flow_dict = solve("vertical_flow", ver_flow)
 
-        for he, side in half_edge_side.items():
-            if side in (0, 1):
-                rf = he.inc
-                rf_id = ('face', 'end') if rf.is_external else rf.id
-                lf_id = he.twin.inc.id
+        half_edge_length = self.dcel.half_edge_map()
 
+        for he, side, lf_id, rf_id, he_id in records:
+            if side in (0, 1):
                 if side == 0:
                     hv_flow_dict = ver_flow_dict
                 else:
                     hv_flow_dict = hor_flow_dict
 
-                length = hv_flow_dict[lf_id][rf_id][he.id]
+                length = hv_flow_dict[lf_id][rf_id][he_id]
                 half_edge_length[he] = length
                 half_edge_length[he.twin] = length
 
         return half_edge_length
 
+    def longest_path_compaction(self, half_edge_side, info):
+        """
+        Compute every edge's length from coordinates of the segments.
+
+        Vertical edges (side 0) join nodes into vertical segments, which share
+        an x coordinate, and horizontal edges (side 1) into horizontal ones.
+        Horizontal edges order the vertical segments left to right and
+        vertical edges order the horizontal segments bottom to top. Once
+        every face is a rectangle any coordinates respecting these orders
+        give a valid drawing, so each segment takes the length of the longest
+        path to it in its DAG.
+        """
+        records = [(he, side, he_id) for he, side, _, _, _, he_id
+                   in self.dcel.half_edge_records(half_edge_side) if side in (0, 1)]
+
+        parent = {}
+
+        def find(node):
+            root = parent.setdefault(node, node)
+            while root != parent[root]:
+                parent[root] = root = parent[parent[root]]
+            return root
+
+        def coordinates(along):
+            """Longest paths over the segments joined by edges of side `along`"""
+            parent.clear()
+            for _, side, (u, v) in records:
+                a, b = find(u), find(v)
+                if side == along:
+                    parent[a] = b
+            succs = {}
+            indegree = {find(node): 0 for node in list(parent)}
+            for _, side, (u, v) in records:
+                if side != along:
+                    a, b = find(u), find(v)
+                    succs.setdefault(a, []).append(b)
+                    indegree[b] += 1
+            coord = {}
+            stack = [seg for seg, d in indegree.items() if d == 0]
+            for seg in stack:
+                coord[seg] = 0
+            visited = 0
+            while stack:
+                a = stack.pop()
+                visited += 1
+                for b in succs.get(a, ()):
+                    coord[b] = max(coord.get(b, 0), coord[a] + 1)
+                    indegree[b] -= 1
+                    if indegree[b] == 0:
+                        stack.append(b)
+            if visited < len(indegree):
+                raise Exception("segments are not ordered, a face is not a rectangle")
+            info["segments"] = info.get("segments", 0) + len(indegree)
+            info["arcs"] = info.get("arcs", 0) + sum(map(len, succs.values()))
+            return {node: coord[find(node)] for node in parent}
+
+        x = coordinates(0)  # vertical segments
+        y = coordinates(1)  # horizontal segments
+
+        half_edge_length = self.dcel.half_edge_map()
+        for he, side, (u, v) in records:
+            length = x[v] - x[u] if side == 1 else y[v] - y[u]
+            half_edge_length[he] = length
+            half_edge_length[he.twin] = length
+        return half_edge_length
+
     def layout(self, half_edge_side, half_edge_length):
         """ return pos of self.G"""
-        pos = {}
-
-        def set_coord(init_he, x, y):
-            for he in init_he.traverse():
-                pos[he.ori.id] = (x, y)
-                side = half_edge_side[he]
-                length = half_edge_length[he]
-                if side == 1:
-                    x += length
-                elif side == 3:
-                    x -= length
-                elif side == 0:
-                    y += length
-                else:
-                    y -= length
-
-            for he in init_he.traverse():
-                for e in he.ori.surround_half_edges():
-                    if e.twin.ori.id not in pos:
-                        set_coord(e, *pos[e.ori.id])
-
-        set_coord(self.dcel.ext_face.inc, 0, 0)
+        init_he = self.dcel.ext_face.inc
+        pos = {init_he.ori.id: (0, 0)}
+
+        # breadth-first over vertices, each reached once by one of its half-edges
+        queue = deque([init_he])
+        while queue:
+            for he, twin, u, v, _ in self.dcel.vertex_star(queue.popleft()):
+                if v not in pos:
+                    x, y = pos[u]
+                    side = half_edge_side[he]
+                    length = half_edge_length[he]
+                    if side == 1:
+                        x += length
+                    elif side == 3:
+                        x -= length
+                    elif side == 0:
+                        y += length
+                    else:
+                        y -= length
+                    pos[v] = (x, y)
+                    queue.append(twin)
         return pos
 
     def remove_dummy(self):
@@ -327,3 +500,60 @@ class Compaction:
                 if node[0] == "dummy":
                     self.G.remove_node(node)
                     self.pos.pop(node, None)
+
+    def remove_crossings(self):
+        """Remove the nodes added by planarize, joining the two neighbors
+        on either side, which are in a line through the crossing
+        """
+        crossings = [node for node in self.G if is_crossing(node)]
+        for node in crossings:
+            x, y = self.pos.pop(node)
+            neighbors = list(self.G[node])
+            self.G.remove_node(node)
+            self.G.add_edge(*[v for v in neighbors if self.pos[v][1] == y])
+            self.G.add_edge(*[v for v in neighbors if self.pos[v][0] == x])
+
+    def edge_routes(self):
+        """{(u, v): points} for every edge of self.G, points running from
+        pos[u] through the bends to pos[v]. Edges split by crossing nodes
+        are joined, straight across each crossing, into one route between
+        nodes which are not crossings.
+        """
+        pos, chains = self.pos, self.bend_chains
+
+        def points(u, v):
+            if (u, v) in chains:
+                return [pos[u], *map(pos.__getitem__, chains[u, v]), pos[v]]
+            if (v, u) in chains:
+                return [pos[u], *map(pos.__getitem__, reversed(chains[v, u])), pos[v]]
+            return [pos[u], pos[v]]
+
+        def across(node, prev, last):
+            """The neighbor of a crossing node opposite to prev, last being
+            the point before the crossing on the way from prev
+            """
+            x, y = pos[node]
+            for v in self.G[node]:
+                if v != prev:
+                    nxt = points(node, v)[1]
+                    if (nxt[1] == y) == (last[1] == y):
+                        return v
+            raise Exception(f"no edge across {node}")
+
+        routes = {}
+        seen = set()
+        for u in self.G:
+            if is_crossing(u):
+                continue
+            for v in self.G[u]:
+                if (u, v) in seen:
+                    continue
+                route = points(u, v)
+                prev = u
+                while is_crossing(v):
+                    prev, v = v, across(v, prev, route[-2])
+                    route.pop()  # the crossing, in line with the points around it
+                    route.extend(points(prev, v)[1:])
+                seen.add((v, prev))  # the same route from the other end
+                routes[u, v] = route
+        return routes
@@ -0,0 +1,141 @@
+"""Layout of disconnected graphs: every connected component is laid out on
+its own, then the drawings are packed side by side without overlap.
+"""
+from math import isqrt
+import networkx as nx
+
+GAP = 1  # empty grid units between two packed components
+
+
+def is_trivial(G):
+    """A path (or a single node), which a straight line lays out without bends"""
+    return G.number_of_edges() == len(G) - 1 and all(degree <= 2 for _, degree in G.degree)
+
+
+def straight_layout(G):
+    """Lay out a path on the x axis, from one end to the other"""
+    if len(G) == 1:
+        return G, {node: (0, 0) for node in G}
+    start = next(node for node, degree in G.degree if degree == 1)
+    pos = {start: (0, 0)}
+    prev, node = None, start
+    while True:
+        nxt = [v for v in G[node] if v != prev]
+        if not nxt:
+            return G, pos
+        prev, node = node, nxt[0]
+        pos[node] = (len(pos), 0)
+
+
+def shelf_pack(sizes, gap=GAP):
+    """Place rectangles of the given (width, height) on shelves, tallest first.
+    Shelves are about as wide as the square root of the total area.
+    Return the lower-left corner of every rectangle.
+    """
+    if not sizes:
+        return []
+    area = sum((w + gap) * (h + gap) for w, h in sizes)
+    width = max(max(w for w, _ in sizes), isqrt(area))
+    order = sorted(range(len(sizes)), key=lambda i: -sizes[i][1])
+
+    corners = [None] * len(sizes)
+    x = y = shelf_height = 0
+    for i in order:
+        w, h = sizes[i]
+        if x > 0 and x + w > width:  # start a new shelf
+            x, y = 0, y + shelf_height + gap
+            shelf_height = 0
+        corners[i] = (x, y)
+        x += w + gap
+        shelf_height = max(shelf_height, h)
+    return corners
+
+
+def is_bend(node):
+    return type(node) is tuple and len(node) > 1 and node[0] == "bend"
+
+
+def graph_routes(H, pos):
+    """(pos, routes) of a layout (H, pos) with bend nodes, see ortho_layout"""
+    from .export import edge_paths
+
+    routes = {(u, v): points for u, v, points in edge_paths(H, pos)}
+    return {node: pos[node] for node in H if not is_bend(node)}, routes
+
+
+def layout_components(G, init_pos, layout, workers=1, **options):
+    """Lay out each connected component of G with layout(H, pos, **options),
+    or with ortho_layout_many when workers > 1, and pack the results.
+    Paths and single nodes are drawn straight, without a flow network.
+    Bend nodes are renumbered so that their names stay unique. The packed
+    graph is of the class of G and keeps its graph, node and edge data.
+    With options["routes"], layout returns (pos, routes) and so does this.
+    """
+    routes = options.get("routes", False)
+    components = [G.subgraph(nodes).copy() for nodes in nx.connected_components(G)]
+    positions = [None if init_pos is None else {node: init_pos[node] for node in H}
+                 for H in components]
+
+    results = [None] * len(components)
+    hard = []
+    for i, H in enumerate(components):
+        if is_trivial(H):
+            results[i] = graph_routes(*straight_layout(H)) if routes else straight_layout(H)
+        else:
+            hard.append(i)
+
+    if workers is not None and workers <= 1:
+        for i in hard:
+            results[i] = layout(components[i], positions[i], **options)
+    elif hard:
+        from .batch import ortho_layout_many
+
+        options.pop("routes", None)  # layouts come back as graphs
+        for k, result, error in ortho_layout_many([components[i] for i in hard],
+                                                  [positions[i] for i in hard],
+                                                  workers, **options):
+            if error is not None:
+                raise error
+            results[hard[k]] = graph_routes(*result) if routes else result
+
+    boxes = []
+    for result in results:
+        if routes:  # bends may lie outside the nodes
+            pos, edge_routes = result
+            points = [*pos.values(), *(p for route in edge_routes.values() for p in route)]
+        else:
+            points = result[1].values()
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        boxes.append((min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)))
+    corners = shelf_pack([(w, h) for _, _, w, h in boxes])
+
+    if routes:
+        packed_pos, packed_routes = {}, {}
+        for (pos, edge_routes), (x0, y0, _, _), (cx, cy) in zip(results, boxes, corners):
+            for node, (x, y) in pos.items():
+                packed_pos[node] = (x - x0 + cx, y - y0 + cy)
+            for edge, route in edge_routes.items():
+                packed_routes[edge] = [(x - x0 + cx, y - y0 + cy) for x, y in route]
+        return packed_pos, packed_routes
+
+    packed = G.__class__()  # like G.copy() for a connected G, bend edges have no data
+    packed.graph.update(G.graph)
+    packed_pos = {}
+    bends = 0
+    for (H, pos), (x0, y0, _, _), (cx, cy) in zip(results, boxes, corners):
+        names = {}
+        for node in H:
+            if is_bend(node):
+                names[node] = ("bend", bends)
+                bends += 1
+            else:
+                names[node] = node
+        # workers send no data back, take it from G but for bend edges
+        packed.add_nodes_from((names[node], G.nodes[node] if node in G else data)
+                              for node, data in H.nodes(data=True))
+        packed.add_edges_from((names[u], names[v], G.edges[u, v] if G.has_edge(u, v) else data)
+                              for u, v, data in H.edges(data=True))
+        for node, (x, y) in pos.items():
+            packed_pos[names[node]] = (x - x0 + cx, y - y0 + cy)
+    return packed, packed_pos
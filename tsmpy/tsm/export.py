@@ -0,0 +1,115 @@
+"""Write layouts as SVG or JSON, straight to a file or stream.
+
+Edges are written as orthogonal polylines: an edge of the input graph,
+split by bend nodes in the layout, comes out as one path through its bend
+points. Everything is written in one pass over the graph, without
+matplotlib.
+"""
+from contextlib import contextmanager
+import json
+import os
+from .tsm import is_bendnode
+
+__all__ = ["edge_paths", "write_svg", "write_json"]
+
+
+def edge_paths(G, pos):
+    """Yield (u, v, points) for every edge of the graph without bend nodes,
+    points runs from pos[u] through the bends to pos[v]
+    """
+    seen = set()
+    for u in G:
+        if is_bendnode(u):
+            continue
+        for nxt in G[u]:
+            if (u, nxt) in seen:
+                continue
+            points = [pos[u]]
+            prev, node = u, nxt
+            while is_bendnode(node):
+                points.append(pos[node])
+                prev, node = node, next(v for v in G[node] if v != prev)
+            points.append(pos[node])
+            seen.add((node, prev))  # the same path walked from the other end
+            yield u, node, points
+
+
+@contextmanager
+def _output(file):
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "w") as f:
+            yield f
+    else:
+        yield file
+
+
+def _number(value):
+    return repr(value) if type(value) is int else format(value, ".10g")
+
+
+def write_svg(G, pos, file, scale=20, node_radius=3, margin=10, stroke_width=1):
+    """Write the layout as SVG.
+
+    Parameters
+    ----------
+    file : path or text stream
+
+    scale : float
+        pixels per unit of the layout grid
+
+    node_radius, margin, stroke_width : float
+        in pixels
+    """
+    if pos:
+        xs = [x for x, _ in pos.values()]
+        ys = [y for _, y in pos.values()]
+        x0, y1 = min(xs), max(ys)
+        width = (max(xs) - x0) * scale + 2 * margin
+        height = (y1 - min(ys)) * scale + 2 * margin
+    else:
+        x0 = y1 = 0
+        width = height = 2 * margin
+
+    def point(p):  # svg y grows downwards
+        return f"{_number((p[0] - x0) * scale + margin)},{_number((y1 - p[1]) * scale + margin)}"
+
+    with _output(file) as f:
+        f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{_number(width)}" '
+                f'height="{_number(height)}" viewBox="0 0 {_number(width)} {_number(height)}">\n')
+        f.write(f'<g fill="none" stroke="black" stroke-width="{_number(stroke_width)}">\n')
+        for _, _, points in edge_paths(G, pos):
+            f.write(f'<polyline points="{" ".join(map(point, points))}"/>\n')
+        f.write('</g>\n')
+        f.write(f'<g fill="white" stroke="black" stroke-width="{_number(stroke_width)}">\n')
+        for node in G:
+            if not is_bendnode(node):
+                x, y = point(pos[node]).split(",")
+                f.write(f'<circle cx="{x}" cy="{y}" r="{_number(node_radius)}"/>\n')
+        f.write('</g>\n</svg>\n')
+
+
+def write_json(G, pos, file):
+    """Write the layout as JSON:
+    {"nodes": [{"id": node, "x": x, "y": y}, ...],
+     "edges": [{"source": u, "target": v, "points": [[x, y], ...]}, ...]}
+    Bend nodes are left out of "nodes". Node names that are not JSON
+    values are written as strings.
+    """
+    def dump(value):
+        return json.dumps(value, default=str)
+
+    with _output(file) as f:
+        f.write('{"nodes": [')
+        first = True
+        for node in G:
+            if not is_bendnode(node):
+                x, y = pos[node]
+                f.write(f'{"" if first else ","}\n{{"id": {dump(node)}, "x": {dump(x)}, "y": {dump(y)}}}')
+                first = False
+        f.write('],\n"edges": [')
+        first = True
+        for u, v, points in edge_paths(G, pos):
+            f.write(f'{"" if first else ","}\n{{"source": {dump(u)}, "target": {dump(v)}, '
+                    f'"points": {dump([list(p) for p in points])}}}')
+            first = False
+        f.write(']}\n')
@@ -1,7 +1,7 @@
 """
 """
 import networkx as nx
-from collections import defaultdict
+from .mincostflow import network_simplex
 
 
 class FlowNet(nx.MultiDiGraph):
@@ -20,39 +20,60 @@ class FlowNet(nx.MultiDiGraph):
         self.add_node(f, demand=(2 * degree + 4)
                       if is_external else (2 * degree - 4))
 
-    def min_cost_flow(self):
-        def get_demand(flow_dict, node):
-            in_flow = sum(flow_dict[u][v][key]
-                          for u, v, key in self.in_edges(node, keys=True))
-            out_flow = sum(flow_dict[u][v][key]
-                           for u, v, key in self.out_edges(node, keys=True))
-            return in_flow - out_flow
-
-        def split(G):
-            base_dict = defaultdict(lambda: defaultdict(dict))
-            new_G = nx.MultiDiGraph()
-
-            for u, v, key in G.edges:
-                lowerbound = G[u][v][key]['lowerbound']
-                base_dict[u][v][key] = lowerbound
-                new_G.add_edge(u, v, key,
-                               capacity=G[u][v][key]['capacity'] -
-                               lowerbound,
-                               weight=G[u][v][key]['weight'],
-                               )
-            for node in G:
-                new_G.nodes[node]['demand'] =  \
-                    G.nodes[node]['demand'] - \
-                    get_demand(base_dict, node)
-            return base_dict, new_G
-
-        base_dict, new_G = split(self)
-        flow_dict = nx.min_cost_flow(new_G)
-        for u, v, key in self.edges:
-            flow_dict[u][v][key] += base_dict[u][v][key]
-
-        self.cost = self.cost_of_flow(flow_dict)
-        return flow_dict
+    def arcs(self):
+        """Return nodes and arcs in array form.
+
+        Returns
+        -------
+        nodes : list
+            node names, a node is referred to by its position
+
+        arcs : list
+            (u, v, key) of every arc, in the order of the other lists
+
+        tails, heads, lower, capacity, weight, demand : list
+        """
+        nodes = list(self)
+        index = {node: i for i, node in enumerate(nodes)}
+        arcs, tails, heads, lower, capacity, weight = [], [], [], [], [], []
+        for u, v, key, data in self.edges(keys=True, data=True):
+            arcs.append((u, v, key))
+            tails.append(index[u])
+            heads.append(index[v])
+            lower.append(data.get('lowerbound', 0))
+            capacity.append(data['capacity'])
+            weight.append(data.get('weight', 0))
+        demand = [self.nodes[node].get('demand', 0) for node in nodes]
+        return nodes, arcs, tails, heads, lower, capacity, weight, demand
+
+    def solve(self, fixed=None):
+        """Solve min cost flow by network simplex, lower bounds included.
 
-    def cost_of_flow(self, flow_dict):
-        return sum(flow_dict[u][v][key] * self[u][v][key]['weight'] for u, v, key in self.edges)
+        Parameters
+        ----------
+        fixed : dict, optional
+            maps arcs (u, v, key) to a flow they are held at
+
+        Returns
+        -------
+        arcs : list
+            (u, v, key) of every arc
+
+        flow : list
+            flow of every arc, indexed like arcs
+        """
+        nodes, arcs, tails, heads, lower, capacity, weight, demand = self.arcs()
+        if fixed:
+            for i, arc in enumerate(arcs):
+                if arc in fixed:
+                    lower[i] = capacity[i] = fixed[arc]
+        flow, self.cost = network_simplex(
+            len(nodes), tails, heads, lower, capacity, weight, demand)
+        return arcs, flow
+
+    def min_cost_flow(self, fixed=None):
+        arcs, flow = self.solve(fixed)
+        flow_dict = {u: {v: {} for v in nbrs} for u, nbrs in self.adj.items()}
+        for (u, v, key), f in zip(arcs, flow):
+            flow_dict[u][v][key] = f
+        return flow_dict
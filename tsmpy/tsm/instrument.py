@@ -0,0 +1,132 @@
+"""Collect timings and problem sizes of the stages of a layout.
+
+    collector = Collector()
+    ortho_layout(G, pos, collector=collector)
+    for record in collector.records:
+        print(record)  # {'stage': 'orthogonalization.solve', 'wall': ..., 'cpu': ..., ...}
+
+Without a collector the stages run under NULL_COLLECTOR, which records nothing.
+"""
+from contextlib import contextmanager
+import json
+import time
+import tracemalloc
+
+__all__ = ["Collector", "NULL_COLLECTOR"]
+
+
+class Collector:
+    """Records one flat dict per stage, in the order the stages start.
+
+    A record has the dotted stage name ("compaction.refine_faces"), its
+    wall and cpu seconds, "error" if it raised, and whatever the stage
+    reported: problem sizes, solver status and objective.
+
+    Parameters
+    ----------
+    callback : callable, optional
+        called with every record as soon as its stage ends, e.g. to forward
+        it to a metrics system
+
+    memory : bool
+        also record "peak_memory", the most bytes allocated by Python at a
+        time during the stage, above what was allocated when the first
+        stage began. Traced with tracemalloc from then until close(), which
+        slows the stages down.
+    """
+
+    def __init__(self, callback=None, memory=False):
+        self.records = []
+        self.callback = callback
+        self.memory = memory
+        self._names = []
+        self._peaks = []  # the peak so far of every open stage
+        self._base = None
+        self._tracing = False
+
+    @contextmanager
+    def stage(self, name):
+        """Time the block, yield the record for it to add values to"""
+        self._names.append(name)
+        record = {"stage": ".".join(self._names)}
+        self.records.append(record)
+        if self.memory:
+            self._enter_memory()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        except Exception as e:
+            record["error"] = repr(e)
+            raise
+        finally:
+            record["wall"] = time.perf_counter() - wall
+            record["cpu"] = time.process_time() - cpu
+            if self.memory:
+                record["peak_memory"] = self._exit_memory()
+            self._names.pop()
+            if self.callback is not None:
+                self.callback(record)
+
+    def _enter_memory(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        current, peak = tracemalloc.get_traced_memory()
+        if self._base is None:
+            self._base = current
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], peak)
+        tracemalloc.reset_peak()
+        self._peaks.append(current)
+
+    def _exit_memory(self):
+        """The peak of the stage ending, which counts for the one around it"""
+        peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], peak)
+        tracemalloc.reset_peak()
+        return peak - self._base
+
+    def close(self):
+        """Stop tracing memory, if this collector started it"""
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    def peaks(self):
+        """Peak bytes by stage name, the largest of repeated stages,
+        with memory=True
+        """
+        peak = {}
+        for record in self.records:
+            if "peak_memory" in record:
+                peak[record["stage"]] = max(peak.get(record["stage"], 0), record["peak_memory"])
+        return peak
+
+    def totals(self):
+        """Wall seconds by stage name, summed over repeated stages"""
+        wall = {}
+        for record in self.records:
+            wall[record["stage"]] = wall.get(record["stage"], 0) + record["wall"]
+        return wall
+
+    def to_json(self):
+        return json.dumps(self.records, default=repr)
+
+
+class _NullStage:
+    def __enter__(self):
+        return {}
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _NullCollector:
+    _stage = _NullStage()
+
+    def stage(self, name):
+        return self._stage
+
+
+NULL_COLLECTOR = _NullCollector()
@@ -0,0 +1,241 @@
+"""Backends for the integer linear programs of lp_solve.
+
+A model is given in matrix form, and every backend takes it as it is:
+
+    minimize    cost @ x
+    subject to  row_lower <= A @ x <= row_upper
+                lower <= x <= upper, x integer
+
+HiGHS runs in-process, through highspy or scipy.optimize.milp, whichever is
+installed. CBC, through pulp, is the fallback and needs no extra packages.
+
+A model can be solved again after changing its costs or bounds, in place.
+Every backend keeps what it built from the constraint matrix and only
+takes the new costs and bounds.
+"""
+from .mincostflow import InfeasibleError
+
+
+class LpModel:
+    """Integer linear program, with the constraint matrix stored by rows.
+    A bound of None means unbounded.
+
+    cost, lower, upper, row_lower and row_upper may be changed between
+    solves. The matrix is converted once for every backend, adding a
+    variable or a row starts over.
+    """
+
+    def __init__(self):
+        self.cost = []
+        self.lower = []
+        self.upper = []
+        self.row_start = [0]  # row i has entries row_start[i]..row_start[i+1]-1
+        self.row_index = []
+        self.row_value = []
+        self.row_lower = []
+        self.row_upper = []
+        self.built = {}  # backend name -> what it made of the matrix
+
+    @classmethod
+    def from_arrays(cls, cost, lower, upper, row_start, row_index, row_value, row_lower,
+                    row_upper):
+        """A model given by its lists, the matrix in compressed rows"""
+        model = cls()
+        model.cost, model.lower, model.upper = cost, lower, upper
+        model.row_start, model.row_index, model.row_value = row_start, row_index, row_value
+        model.row_lower, model.row_upper = row_lower, row_upper
+        return model
+
+    @property
+    def num_vars(self):
+        return len(self.cost)
+
+    @property
+    def num_rows(self):
+        return len(self.row_lower)
+
+    def add_var(self, lower, upper, cost=0):
+        """Add an integer variable, return its index"""
+        self.built.clear()
+        self.cost.append(cost)
+        self.lower.append(lower)
+        self.upper.append(upper)
+        return len(self.cost) - 1
+
+    def add_row(self, coefs, lower, upper):
+        """Add lower <= sum(value * x[index] for index, value in coefs) <= upper.
+        Repeated indices are summed, HiGHS rejects duplicate entries.
+        """
+        self.built.clear()
+        merged = {}
+        for i, value in coefs:
+            merged[i] = merged.get(i, 0) + value
+        for i, value in merged.items():
+            if value:
+                self.row_index.append(i)
+                self.row_value.append(value)
+        self.row_start.append(len(self.row_index))
+        self.row_lower.append(lower)
+        self.row_upper.append(upper)
+
+
+def solve_highs(model):
+    import highspy
+    import numpy as np
+
+    inf = highspy.kHighsInf
+
+    def bounds(values, default):
+        return np.array([default if b is None else b for b in values], dtype=np.double)
+
+    lp = model.built.get("highs")
+    if lp is None:
+        lp = model.built["highs"] = highspy.HighsLp()
+        lp.num_col_ = model.num_vars
+        lp.num_row_ = model.num_rows
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+        lp.a_matrix_.start_ = np.array(model.row_start, dtype=np.int32)
+        lp.a_matrix_.index_ = np.array(model.row_index, dtype=np.int32)
+        lp.a_matrix_.value_ = np.array(model.row_value, dtype=np.double)
+        lp.integrality_ = [highspy.HighsVarType.kInteger] * model.num_vars
+    lp.col_cost_ = np.array(model.cost, dtype=np.double)
+    lp.col_lower_ = bounds(model.lower, -inf)
+    lp.col_upper_ = bounds(model.upper, inf)
+    lp.row_lower_ = bounds(model.row_lower, -inf)
+    lp.row_upper_ = bounds(model.row_upper, inf)
+
+    h = highspy.Highs()
+    h.setOptionValue("output_flag", False)
+    h.passModel(lp)
+    h.run()
+    if h.getModelStatus() != highspy.HighsModelStatus.kOptimal:
+        return None
+    return list(h.getSolution().col_value)
+
+
+def solve_scipy(model):
+    import numpy as np
+    from scipy.optimize import milp, Bounds, LinearConstraint
+    from scipy.sparse import csr_matrix
+
+    def bounds(values, default):
+        return np.array([default if b is None else b for b in values], dtype=float)
+
+    A = model.built.get("scipy")
+    if A is None:
+        A = model.built["scipy"] = csr_matrix((model.row_value, model.row_index, model.row_start),
+                                              shape=(model.num_rows, model.num_vars))
+    res = milp(np.array(model.cost, dtype=float),
+               integrality=np.ones(model.num_vars),
+               bounds=Bounds(bounds(model.lower, -np.inf), bounds(model.upper, np.inf)),
+               constraints=LinearConstraint(A, bounds(model.row_lower, -np.inf),
+                                            bounds(model.row_upper, np.inf)))
+    if res.status != 0:
+        return None
+    return list(res.x)
+
+
+def _row_kinds(model):
+    """Which sides of every row are bounded, pulp needs another problem
+    when they change
+    """
+    return [(lower is not None, upper is not None, lower == upper)
+            for lower, upper in zip(model.row_lower, model.row_upper)]
+
+
+def solve_cbc(model):
+    import pulp
+
+    kinds = _row_kinds(model)
+    built = model.built.get("cbc")
+    if built is None or built[3] != kinds:
+        prob = pulp.LpProblem()  # minimize
+        x = [pulp.LpVariable(str(i), lower, upper, pulp.LpInteger)
+             for i, (lower, upper) in enumerate(zip(model.lower, model.upper))]
+        rows = []  # the constraints of every row, (lower, upper) or (equal,)
+        start = model.row_start
+        for r in range(model.num_rows):
+            expr = pulp.LpAffineExpression(
+                (x[model.row_index[k]], model.row_value[k]) for k in range(start[r], start[r + 1]))
+            lower, upper = model.row_lower[r], model.row_upper[r]
+            if lower == upper:
+                constraints = [expr == lower]
+            else:
+                constraints = [expr >= (lower or 0), expr <= (upper or 0)]
+            rows.append(constraints)
+            for constraint, bound in zip(constraints, (lower, upper)):
+                if bound is not None:
+                    prob += constraint
+        built = model.built["cbc"] = prob, x, rows, kinds
+    else:
+        prob, x, rows, _ = built
+        for var, lower, upper in zip(x, model.lower, model.upper):
+            var.lowBound, var.upBound = lower, upper
+        for constraints, lower, upper in zip(rows, model.row_lower, model.row_upper):
+            for constraint, bound in zip(constraints, (lower, upper)):
+                if bound is not None:
+                    constraint.changeRHS(bound)
+    prob.setObjective(pulp.LpAffineExpression((x[i], c) for i, c in enumerate(model.cost) if c))
+
+    if prob.solve(pulp.PULP_CBC_CMD(msg=False)) != 1:
+        return None
+    return [var.varValue for var in x]
+
+
+def _has_highspy():
+    try:
+        import highspy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _has_scipy_milp():
+    try:
+        from scipy.optimize import milp  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+BACKENDS = {
+    "highs": solve_highs,
+    "scipy": solve_scipy,
+    "cbc": solve_cbc,
+}
+
+
+def available_backends():
+    """Names of the backends usable here, in the order "auto" tries them"""
+    names = []
+    if _has_highspy():
+        names.append("highs")
+    if _has_scipy_milp():
+        names.append("scipy")
+    names.append("cbc")
+    return names
+
+
+def resolve_backend(backend):
+    """Name of the backend solve uses for backend, checked"""
+    if backend == "auto":
+        backend = available_backends()[0]
+    if backend not in BACKENDS:
+        raise Exception(f"Unknown LP solver {backend!r}, expected one of "
+                        f"{', '.join(['auto', *BACKENDS])}")
+    return backend
+
+
+def solve(model, backend="auto"):
+    """Solve model, return the integer value of every variable.
+
+    Parameters
+    ----------
+    backend : str
+        "highs" (highspy), "scipy" (HiGHS through scipy.optimize.milp),
+        "cbc" (pulp) or "auto", the first of them that is installed.
+    """
+    values = BACKENDS[resolve_backend(backend)](model)
+    if values is None:
+        raise InfeasibleError("Problem can't be solved by linear programming")
+    return [int(round(value)) for value in values]
@@ -0,0 +1,287 @@
+"""Minimum cost flow by the primal network simplex method.
+
+Works on a compact arc list (parallel lists of tails, heads, lower bounds,
+capacities and costs over nodes 0..n-1) instead of a networkx graph, and
+handles lower bounds directly. The pivoting follows the strongly feasible
+spanning tree method also used by networkx.network_simplex.
+"""
+from itertools import chain, islice
+from math import ceil, sqrt
+
+
+class InfeasibleError(Exception):
+    """No flow, or no solution of a linear program, meets all constraints"""
+
+
+def network_simplex(n, tails, heads, lower, capacity, cost, demand):
+    """
+    Parameters
+    ----------
+    n : int
+        number of nodes, named 0..n-1
+    tails, heads, lower, capacity, cost : list
+        one entry per arc
+    demand : list
+        net inflow required at each node, negative for sources
+
+    Returns
+    -------
+    flow : list
+        flow of each arc, indexed like the input arcs
+
+    cost : int
+        total cost of the flow
+    """
+    if n == 0:
+        return [], 0
+    if sum(demand) != 0:
+        raise InfeasibleError("total demand is not zero, no feasible flow")
+
+    # substitute flow = lower + x, so that 0 <= x <= capacity - lower.
+    # Arcs with no room left and self-loops never enter the spanning tree:
+    # they are fixed here and left out of pricing, otherwise they would
+    # enter and leave at once forever.
+    result = list(lower)
+    demand = list(demand)
+    active = []
+    cap = []
+    for i in range(len(tails)):
+        lb = lower[i]
+        if lb > capacity[i]:
+            raise Exception(f"lower bound of arc {i} exceeds its capacity")
+        if lb:
+            demand[tails[i]] += lb
+            demand[heads[i]] -= lb
+        if tails[i] == heads[i]:
+            if cost[i] < 0:  # a negative loop is saturated
+                result[i] = capacity[i]
+        elif capacity[i] > lb:
+            active.append(i)
+            cap.append(capacity[i] - lb)
+    m = len(active)
+    tails = [tails[i] for i in active]
+    heads = [heads[i] for i in active]
+    cost_active = [cost[i] for i in active]
+
+    faux_inf = 3 * max(sum(cap), sum(abs(c) for c in cost_active),
+                       sum(abs(d) for d in demand), 1)
+
+    # artificial arcs i = m + p connect node p with the root n
+    root = n
+    S = list(tails)
+    T = list(heads)
+    for p, d in enumerate(demand):
+        # zero-demand nodes point towards the root for strong feasibility
+        if d > 0:
+            S.append(root)
+            T.append(p)
+        else:
+            S.append(p)
+            T.append(root)
+    C = cost_active + [faux_inf] * n
+    U = cap + [faux_inf] * n
+    x = [0] * m + [abs(d) for d in demand]
+
+    # spanning tree of the artificial arcs, with a depth-first thread
+    pi = [faux_inf if d <= 0 else -faux_inf for d in demand] + [0]
+    parent = [root] * n + [None]
+    parent_edge = list(range(m, m + n)) + [None]
+    subtree_size = [1] * n + [n + 1]
+    next_node_dfs = list(range(1, n)) + [root, 0]
+    prev_node_dfs = [root] + list(range(n))
+    last_descendent_dfs = list(range(n)) + [n - 1]
+
+    def reduced_cost(i):
+        c = C[i] - pi[S[i]] + pi[T[i]]
+        return c if x[i] == 0 else -c
+
+    def find_entering_edges():
+        """Yield (arc, p, q), with flow to be pushed from p to q along arc"""
+        if m == 0:
+            return
+        B = int(ceil(sqrt(m)))  # block size
+        M = (m + B - 1) // B  # number of blocks
+        blocks = 0
+        f = 0
+        while blocks < M:
+            l = f + B
+            if l <= m:
+                edges = range(f, l)
+            else:
+                l -= m
+                edges = chain(range(f, m), range(l))
+            f = l
+            i = min(edges, key=reduced_cost)
+            if reduced_cost(i) >= 0:
+                blocks += 1
+            else:
+                if x[i] == 0:
+                    yield i, S[i], T[i]
+                else:
+                    yield i, T[i], S[i]
+                blocks = 0
+
+    def find_apex(p, q):
+        size_p = subtree_size[p]
+        size_q = subtree_size[q]
+        while True:
+            while size_p < size_q:
+                p = parent[p]
+                size_p = subtree_size[p]
+            while size_p > size_q:
+                q = parent[q]
+                size_q = subtree_size[q]
+            if size_p == size_q:
+                if p != q:
+                    p = parent[p]
+                    size_p = subtree_size[p]
+                    q = parent[q]
+                    size_q = subtree_size[q]
+                else:
+                    return p
+
+    def trace_path(p, w):
+        Wn = [p]
+        We = []
+        while p != w:
+            We.append(parent_edge[p])
+            p = parent[p]
+            Wn.append(p)
+        return Wn, We
+
+    def find_cycle(i, p, q):
+        w = find_apex(p, q)
+        Wn, We = trace_path(p, w)
+        Wn.reverse()
+        We.reverse()
+        if We != [i]:
+            We.append(i)
+            WnR, WeR = trace_path(q, w)
+            del WnR[-1]
+            Wn += WnR
+            We += WeR
+        return Wn, We
+
+    def residual_capacity(i, p):
+        return U[i] - x[i] if S[i] == p else x[i]
+
+    def find_leaving_edge(Wn, We):
+        j, s = min(zip(reversed(We), reversed(Wn)),
+                   key=lambda i_p: residual_capacity(*i_p))
+        t = T[j] if S[j] == s else S[j]
+        return j, s, t
+
+    def augment_flow(Wn, We, f):
+        for i, p in zip(We, Wn):
+            if S[i] == p:
+                x[i] += f
+            else:
+                x[i] -= f
+
+    def trace_subtree(p):
+        yield p
+        last = last_descendent_dfs[p]
+        while p != last:
+            p = next_node_dfs[p]
+            yield p
+
+    def remove_edge(s, t):
+        """Remove tree arc (s, t), t is a child of s"""
+        size_t = subtree_size[t]
+        prev_t = prev_node_dfs[t]
+        last_t = last_descendent_dfs[t]
+        next_last_t = next_node_dfs[last_t]
+        parent[t] = None
+        parent_edge[t] = None
+        next_node_dfs[prev_t] = next_last_t
+        prev_node_dfs[next_last_t] = prev_t
+        next_node_dfs[last_t] = t
+        prev_node_dfs[t] = last_t
+        while s is not None:
+            subtree_size[s] -= size_t
+            if last_descendent_dfs[s] == last_t:
+                last_descendent_dfs[s] = prev_t
+            s = parent[s]
+
+    def make_root(q):
+        """Make q the root of its subtree"""
+        ancestors = []
+        while q is not None:
+            ancestors.append(q)
+            q = parent[q]
+        ancestors.reverse()
+        for p, q in zip(ancestors, islice(ancestors, 1, None)):
+            size_p = subtree_size[p]
+            last_p = last_descendent_dfs[p]
+            prev_q = prev_node_dfs[q]
+            last_q = last_descendent_dfs[q]
+            next_last_q = next_node_dfs[last_q]
+            # make p a child of q
+            parent[p] = q
+            parent[q] = None
+            parent_edge[p] = parent_edge[q]
+            parent_edge[q] = None
+            subtree_size[p] = size_p - subtree_size[q]
+            subtree_size[q] = size_p
+            # remove the subtree rooted at q from the thread
+            next_node_dfs[prev_q] = next_last_q
+            prev_node_dfs[next_last_q] = prev_q
+            next_node_dfs[last_q] = q
+            prev_node_dfs[q] = last_q
+            if last_p == last_q:
+                last_descendent_dfs[p] = prev_q
+                last_p = prev_q
+            # append what is left of p's subtree to q's subtree
+            prev_node_dfs[p] = last_q
+            next_node_dfs[last_q] = p
+            next_node_dfs[last_p] = q
+            prev_node_dfs[q] = last_p
+            last_descendent_dfs[q] = last_p
+
+    def add_edge(i, p, q):
+        """Add tree arc i, making q a child of p"""
+        last_p = last_descendent_dfs[p]
+        next_last_p = next_node_dfs[last_p]
+        size_q = subtree_size[q]
+        last_q = last_descendent_dfs[q]
+        parent[q] = p
+        parent_edge[q] = i
+        next_node_dfs[last_p] = q
+        prev_node_dfs[q] = last_p
+        prev_node_dfs[next_last_p] = last_q
+        next_node_dfs[last_q] = next_last_p
+        while p is not None:
+            subtree_size[p] += size_q
+            if last_descendent_dfs[p] == last_p:
+                last_descendent_dfs[p] = last_q
+            p = parent[p]
+
+    def update_potentials(i, p, q):
+        """Make the reduced cost of arc i zero, shifting the subtree of q"""
+        if q == T[i]:
+            d = pi[p] - C[i] - pi[q]
+        else:
+            d = pi[p] + C[i] - pi[q]
+        for q in trace_subtree(q):
+            pi[q] += d
+
+    for i, p, q in find_entering_edges():
+        Wn, We = find_cycle(i, p, q)
+        j, s, t = find_leaving_edge(Wn, We)
+        augment_flow(Wn, We, residual_capacity(j, s))
+        if i != j:  # nothing else to do if the entering arc leaves at once
+            if parent[t] != s:
+                s, t = t, s  # s is the parent of t
+            if We.index(i) > We.index(j):
+                p, q = q, p  # q is in the subtree rooted at t
+            remove_edge(s, t)
+            make_root(q)
+            add_edge(i, p, q)
+            update_potentials(i, p, q)
+
+    if any(x[i] != 0 for i in range(m, m + n)):
+        raise InfeasibleError("no flow satisfies all demands")
+
+    for k, i in enumerate(active):
+        result[i] += x[k]
+    return result, sum(f * c for f, c in zip(result, cost))
@@ -1,113 +1,169 @@
-import pulp
 from collections import defaultdict
 from .flownet import FlowNet
+from . import lpsolver
+from .instrument import NULL_COLLECTOR
 
 
 class Orthogonalization:
     '''works on a planar embedding, changes shape of the graph.
     '''
 
-    def __init__(self, planar, uselp=False):
+    def __init__(self, planar, uselp=False, solver="auto", fixed=None, collector=NULL_COLLECTOR,
+                 low_memory=False):
+        """fixed maps arcs (u, v, key) of the flow network to a flow they keep.
+        With low_memory, the flow network is dropped once it is solved.
+        """
         self.G = planar.G
         self.dcel = planar.dcel
-
-        self.flow_network = self.face_determination()
-        if not uselp:
-            self.flow_dict = self.tamassia_orthogonalization()
+        self.uselp = uselp
+        self.solver = solver
+        self.collector = collector
+        self.lp = None  # the model of lp_solve, kept for resolve
+
+        with collector.stage("orthogonalization"):
+            with collector.stage("flow_network") as info:
+                self.flow_network = self.face_determination()
+                info["nodes"] = self.flow_network.number_of_nodes()
+                info["arcs"] = self.flow_network.number_of_edges()
+                info["fixed_arcs"] = len(fixed or ())
+            if not uselp:
+                self.flow_dict = self.tamassia_orthogonalization(fixed)
+            else:
+                self.flow_dict = self.lp_solve(fixed)
+            if low_memory:
+                # emptied first, a networkx graph is only freed by the cyclic gc
+                self.flow_network.clear()
+                self.flow_network = None
+                self.lp = None
+
+    def resolve(self, fixed=None):
+        """Solve again with other fixed arcs, return the new flow_dict.
+        The flow network, and the LP model with uselp, are reused, so it
+        can't be done after low_memory.
+        """
+        if self.flow_network is None:
+            raise Exception("the flow network was dropped by low_memory")
+        if not self.uselp:
+            self.flow_dict = self.tamassia_orthogonalization(fixed)
         else:
-            self.flow_dict = self.lp_solve()
+            self.flow_dict = self.lp_solve(fixed)
+        return self.flow_dict
 
     def face_determination(self):
         flow_network = FlowNet()
 
-        for vertex in self.dcel.vertices.values():
-            flow_network.add_v(vertex.id)
+        for v in self.dcel.vertices:
+            flow_network.add_v(v)
 
-        for face in self.dcel.faces.values():
-            flow_network.add_f(face.id, len(
-                face), face.is_external)
+        for f, degree, is_external in self.dcel.face_degrees():
+            flow_network.add_f(f, degree, is_external)
 
-        for vertex in self.dcel.vertices.values():
-            for he in vertex.surround_half_edges():
-                flow_network.add_v2f(vertex.id, he.inc.id, he.id)
+        for v, f, he_id in self.dcel.corners():
+            flow_network.add_v2f(v, f, he_id)
 
-        for he in self.dcel.half_edges.values():
-            flow_network.add_f2f(he.twin.inc.id, he.inc.id, he.id)  # lf -> rf
+        for lf, rf, he_id in self.dcel.dual_edges():
+            flow_network.add_f2f(lf, rf, he_id)
 
         return flow_network
 
-    def tamassia_orthogonalization(self):
-        return self.flow_network.min_cost_flow()
+    def tamassia_orthogonalization(self, fixed=None):
+        with self.collector.stage("solve") as info:
+            info["solver"] = "network_simplex"
+            flow_dict = self.flow_network.min_cost_flow(fixed)
+            info["status"] = "optimal"
+            info["objective"] = self.flow_network.cost
+        return flow_dict
 
-    def lp_solve(self):
+    def lp_solve(self, fixed=None):
         '''
         Use linear programming to solve min cost flow problem, make it possible to define constrains.
 
-        Alert: pulp will automatically transfer node's name into str and repalce some special
-        chars into '_', and will throw a error if there are variables' name duplicated.
+        The model is built in matrix form and handed to the backend chosen by self.solver,
+        see lpsolver.solve. It is kept, solving again with other fixed arcs only changes bounds.
         '''
+        if self.lp is None:
+            with self.collector.stage("lp_model") as info:
+                self.lp = self.lp_model()
+                model = self.lp[0]
+                info["variables"] = model.num_vars
+                info["constraints"] = model.num_rows
+                info["nonzeros"] = len(model.row_index)
+        model, arcs, lower, capacity = self.lp
+
+        model.lower[:len(arcs)] = lower
+        model.upper[:len(arcs)] = capacity
+        if fixed:
+            for i, arc in enumerate(arcs):
+                if arc in fixed:
+                    model.lower[i] = model.upper[i] = fixed[arc]
+
+        with self.collector.stage("solve") as info:
+            info["solver"] = lpsolver.resolve_backend(self.solver)
+            values = lpsolver.solve(model, self.solver)
+            self.flow_network.cost = sum(c * x for c, x in zip(model.cost, values))
+            info["status"] = "optimal"
+            info["objective"] = self.flow_network.cost
 
-        prob = pulp.LpProblem()  # minimize
-
-        var_dict = {}
-        var_names = {}  # turn (u, v, he_id) into digit string
-        for u, v, he_id in self.flow_network.edges:
-            var_names[str(len(var_names))] = (u, v, he_id)
-            var_dict[u, v, he_id] = pulp.LpVariable(
-                str(len(var_names) - 1),
-                self.flow_network[u][v][he_id]['lowerbound'],
-                self.flow_network[u][v][he_id]['capacity'],
-                pulp.LpInteger
-            )
-
-        objs = []
-
-        # cost of bend
-        for he in self.dcel.half_edges.values():
-            lf, rf = he.twin.inc.id, he.inc.id
-            objs.append(
-                self.flow_network[lf][rf][he.id]['weight'] *
-                var_dict[lf, rf, he.id]
-            )
-
-        # Add nonsymmetric cost
-        for v in self.G:
-            if self.G.degree(v) == 2:
-                (f1, he1_id), (f2, he2_id) = [(f, key)
-                                              for f, keys in self.flow_network.adj[v].items()
-                                              for key in keys]
-                x = var_dict[v, f1, he1_id]
-                y = var_dict[v, f2, he2_id]
-                p = pulp.LpVariable(
-                    x.name + "*", None, None, pulp.LpInteger)
-                prob.addConstraint(x - y <= p + p + p + p)
-                prob.addConstraint(y - x <= p + p + p + p)
-                objs.append(p)
-
-        prob += pulp.lpSum(objs)  # number of bends in graph
-
-        for f in self.dcel.faces:
-            in_sum = pulp.lpSum(
-                [var_dict[v, f, he_id] for v, _, he_id in self.flow_network.in_edges(f, keys=True)])
-
-            out_sum = pulp.lpSum(
-                [var_dict[f, v, he_id] for _, v, he_id in self.flow_network.out_edges(f, keys=True)])
-
-            prob += self.flow_network.nodes[f]['demand'] == in_sum - out_sum
-        for v in self.G:
-            prob += -self.flow_network.nodes[v]['demand'] == pulp.lpSum(
-                [var_dict[v, f, he_id] for _, f, he_id in
-                 self.flow_network.out_edges(v, keys=True)]
-            )
-
-        state = prob.solve(pulp.PULP_CBC_CMD(msg=False))
         res = defaultdict(lambda: defaultdict(dict))
-        if state == 1:  # update flow_dict
-            self.flow_network.cost = pulp.value(prob.objective)
-            for var in prob.variables():
-                if var.name.isdigit():
-                    u, v, he_id = var_names[var.name]
-                    res[u][v][he_id] = int(var.varValue)
-            return res
-        else:
-            raise Exception("Problem can't be solved by linear programming")
+        for (u, v, he_id), x in zip(arcs, values):
+            res[u][v][he_id] = x
+        return res
+
+    def lp_model(self):
+        """The program of lp_solve, with no arc fixed.
+
+        Returns (model, arcs, lower, capacity): variable i is the arc
+        arcs[i] = (u, v, key) of the flow network, between lower[i] and
+        capacity[i], then comes one variable per vertex of degree 2.
+
+        The matrix is filled in one pass over the arcs. Its rows are the
+        nonsymmetric costs, then the conservation of flow at every face and
+        every vertex.
+        """
+        nodes, arcs, tails, heads, lower, capacity, weight, demand = self.flow_network.arcs()
+        vertices = len(self.dcel.vertices)  # nodes are the vertices, then the faces
+        faces = len(nodes) - vertices
+
+        out_arcs = [[] for _ in range(vertices)]
+        for i, t in enumerate(tails):
+            if t < vertices:
+                out_arcs[t].append(i)
+        two = [out for out in out_arcs if len(out) == 2]  # vertices of degree 2
+
+        # row of every node, after two rows per vertex of degree 2
+        first = 2 * len(two)
+        row_of = [first + faces + v for v in range(vertices)]
+        row_of += [first + f for f in range(faces)]
+
+        count = [3] * first + [0] * len(nodes)
+        for t, h in zip(tails, heads):
+            if t != h:  # an arc from a face to itself adds as much as it takes
+                count[row_of[t]] += 1
+                count[row_of[h]] += 1
+        row_start = [0]
+        for c in count:
+            row_start.append(row_start[-1] + c)
+        row_index = [0] * row_start[-1]
+        row_value = [0] * row_start[-1]
+
+        # Add nonsymmetric cost, x - y <= 4p and y - x <= 4p
+        k = 0
+        for p, (x, y) in enumerate(two, len(arcs)):
+            row_index[k:k + 6] = x, y, p, y, x, p
+            row_value[k:k + 6] = 1, -1, -4, 1, -1, -4
+            k += 6
+
+        # inflow - outflow = demand at a face, outflow = -demand at a vertex
+        fill = row_start[first:-1]
+        for i, (t, h) in enumerate(zip(tails, heads)):
+            if t != h:
+                for node, value in ((t, 1 if t < vertices else -1), (h, 1)):
+                    r = row_of[node] - first
+                    row_index[fill[r]], row_value[fill[r]] = i, value
+                    fill[r] += 1
+
+        bounds = [demand[vertices + f] for f in range(faces)] + [-demand[v] for v in range(vertices)]
+        model = lpsolver.LpModel.from_arrays(
+            weight + [1] * len(two), lower + [None] * len(two), capacity + [None] * len(two),
+            row_start, row_index, row_value, [None] * first + bounds, [0] * first + bounds)
+        return model, arcs, lower, capacity
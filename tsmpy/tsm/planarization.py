@@ -1,32 +1,88 @@
-from .utils import convert_pos_to_embedding
-from tsmpy.dcel import Dcel
+from .utils import rotation_system
+from .instrument import NULL_COLLECTOR
+from tsmpy.dcel import Dcel, CompactDcel
 import networkx as nx
 
 
 class Planarization:
     """Determine the topology of the drawing which is described by a planar embedding.
+
+    Parameters
+    ----------
+    check_embedding : bool
+        make sure the rotation system given by pos is planar, which it is
+        unless edges of pos cross. Skip it for trusted input.
+
+    planarize : bool
+        accept a non-planar G, or crossings in pos, by replacing crossings
+        with nodes ("crossing", k), see planarize.planarize
+
+    low_memory : bool
+        use G itself instead of a copy. The later stages turn it into the
+        layout graph, so G is not left as it was.
     """
 
-    def __init__(self, G, pos=None):
-        if pos is None:
-            is_planar, embedding = nx.check_planarity(G)
-            pos = nx.combinatorial_embedding_to_pos(embedding)
-        else:
-            embedding = convert_pos_to_embedding(G, pos)
+    def __init__(self, G, pos=None, compact=False, collector=NULL_COLLECTOR,
+                 check_embedding=True, planarize=False, low_memory=False):
+        ext = None
+        with collector.stage("planarization") as info:
+            with collector.stage("embedding"):
+                if planarize:
+                    from .planarize import planarize as add_crossings
+
+                    n = len(G)
+                    G, embedding, ext = add_crossings(G, pos)
+                    info["crossings"] = len(G) - n
+                    check_embedding = False
+                    low_memory = True  # G is a new graph already
+                elif pos is None:
+                    is_planar, embedding = nx.check_planarity(G)
+                    pos = nx.combinatorial_embedding_to_pos(embedding)
+                    check_embedding = False
+                else:
+                    embedding = rotation_system(G, pos)
 
-        self.G = G.copy()
-        self.dcel = Dcel(G, embedding)
-        self.dcel.ext_face = self.get_external_face(pos)
-        self.dcel.ext_face.is_external = True
+            with collector.stage("dcel"):
+                self.G = G if low_memory else G.copy()
+                self.dcel = (CompactDcel if compact else Dcel)(G, embedding)
+                if check_embedding:
+                    self.check_faces()
+                if ext is None:
+                    self.dcel.ext_face = self.get_external_face(pos)
+                else:
+                    self.dcel.ext_face = self.dcel.half_edges[ext].inc
+                self.dcel.ext_face.is_external = True
+            info["vertices"] = len(self.dcel.vertices)
+            info["faces"] = len(self.dcel.faces)
+
+    def check_faces(self):
+        """Raise if the faces break Euler's formula, V - E + F = 2 for every
+        component, i.e. the embedding is not planar
+        """
+        G = self.G
+        isolated = nx.number_of_isolates(G)  # no half-edge, no face in the dcel
+        expected = (G.number_of_edges() - len(G) + 2 * nx.number_connected_components(G)
+                    - isolated)
+        if len(self.dcel.faces) != expected:
+            raise nx.NetworkXException(
+                "Bad planar embedding. The number of faces does not match Euler's "
+                "formula, edges of pos may cross")
 
     def get_external_face(self, pos):
-        corner_node = min(pos, key=lambda k: (pos[k][0], pos[k][1]))
+        return self.dcel.half_edges[external_half_edge(self.G, pos)].inc
+
+
+def external_half_edge(G, pos):
+    """The half-edge (u, v) leaving the lowest left node of pos with the
+    smallest angle, which lies on the external face
+    """
+    corner_node = min(pos, key=lambda k: (pos[k][0], pos[k][1]))
 
-        sine_vals = {}
-        for node in self.G.adj[corner_node]:
-            dx = pos[node][0] - pos[corner_node][0]
-            dy = pos[node][1] - pos[corner_node][1]
-            sine_vals[node] = dy / (dx**2 + dy**2)**0.5
+    sine_vals = {}
+    for node in G.adj[corner_node]:
+        dx = pos[node][0] - pos[corner_node][0]
+        dy = pos[node][1] - pos[corner_node][1]
+        sine_vals[node] = dy / (dx**2 + dy**2)**0.5
 
-        other_node = min(sine_vals, key=lambda node: sine_vals[node])
-        return self.dcel.half_edges[corner_node, other_node].inc
+    other_node = min(sine_vals, key=lambda node: sine_vals[node])
+    return corner_node, other_node
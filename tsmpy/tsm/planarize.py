@@ -0,0 +1,195 @@
+"""Turn a non-planar graph into a planar one by adding crossing nodes.
+
+A maximal planar subgraph is embedded first, then every edge left out is
+inserted again along a shortest path in the dual graph of the embedding.
+Each edge it crosses is split by a node ("crossing", k) of degree 4, which
+Compaction removes at the end, leaving the two edges crossing there.
+"""
+from collections import deque
+import networkx as nx
+from tsmpy.dcel import Dcel, RotationSystem
+from .planarization import external_half_edge
+from .utils import crossing_pairs, rotation_system
+
+__all__ = ["planar_subgraph", "planarize"]
+
+
+def _spanning_tree(G):
+    edges = []
+    for component in nx.connected_components(G):
+        edges.extend(nx.bfs_edges(G, next(iter(component))))
+    return edges
+
+
+def planar_subgraph(G, pos=None):
+    """Return (H, removed), H a maximal planar subgraph of G with all its
+    nodes and its spanning tree, removed the edges of G not in H.
+
+    Without pos, edges are added greedily to a spanning tree and tested
+    with nx.check_planarity in batches, halved when they fail, so a planar
+    G costs one test. With pos, H is made of the edges which cross no edge
+    kept before them, those of the spanning tree and with fewer crossings
+    first; H is then None if they do not connect G.
+    """
+    tree = _spanning_tree(G)
+    if pos is not None:
+        crossing = {}
+        for e, f in crossing_pairs(G, pos):
+            crossing.setdefault(frozenset(e), []).append(frozenset(f))
+            crossing.setdefault(frozenset(f), []).append(frozenset(e))
+        tree_edges = {frozenset(e) for e in tree}
+        order = sorted(G.edges, key=lambda e: (frozenset(e) not in tree_edges,
+                                               len(crossing.get(frozenset(e), ()))))
+        kept, removed = set(), []
+        for e in order:
+            if any(f in kept for f in crossing.get(frozenset(e), ())):
+                removed.append(e)
+            else:
+                kept.add(frozenset(e))
+        H = nx.Graph()
+        H.add_nodes_from(G)
+        H.add_edges_from(e for e in G.edges if frozenset(e) in kept)
+        if nx.number_connected_components(H) != nx.number_connected_components(G):
+            return None, removed
+        return H, removed
+
+    H = nx.Graph()
+    H.add_nodes_from(G)
+    H.add_edges_from(tree)
+    removed = []
+    stack = [[e for e in G.edges if not H.has_edge(*e)]]
+    while stack:
+        batch = stack.pop()
+        if not batch:
+            continue
+        H.add_edges_from(batch)
+        if nx.check_planarity(H)[0]:
+            continue
+        H.remove_edges_from(batch)
+        if len(batch) == 1:
+            removed.append(batch[0])
+        else:
+            half = len(batch) // 2
+            stack.append(batch[half:])
+            stack.append(batch[:half])
+    return H, removed
+
+
+def _split_face(dcel, he_u, he_v, face_name):
+    """Add the edge between the origins of he_u and he_v, two half-edges of
+    the same face, the part of the face on the side of (v, u) becomes a new face
+    """
+    u, v = he_u.ori.id, he_v.ori.id
+    face = he_u.inc
+    prev_u, prev_v = he_u.prev, he_v.prev
+    he_uv = dcel._new_half_edge(u, v)
+    he_vu = dcel._new_half_edge(v, u)
+    dcel.half_edges[u, v] = he_uv
+    dcel.half_edges[v, u] = he_vu
+    he_uv.set(he_vu, he_u.ori, prev_u, he_v, face)
+    he_vu.set(he_uv, he_v.ori, prev_v, he_u, None)
+    prev_u.succ = he_uv
+    he_v.prev = he_uv
+    prev_v.succ = he_vu
+    he_u.prev = he_vu
+
+    new = dcel._new_face(face_name)
+    dcel.faces[face_name] = new
+    new.inc = he_vu
+    for he in he_vu.traverse():
+        he.inc = new
+        new.size += 1
+    face.inc = he_uv
+    face.size += 2 - new.size
+
+
+def _dual_path(dcel, u, v):
+    """Shortest path in the dual from a face at u to a face at v.
+    Return (half-edge leaving u, half-edges crossed, half-edge leaving v),
+    the crossed ones as seen from the face before them
+    """
+    start = {}
+    for he in dcel.vertices[u].surround_half_edges():
+        start.setdefault(he.inc, he)
+    goal = {}
+    for he in dcel.vertices[v].surround_half_edges():
+        goal.setdefault(he.inc, he)
+
+    parent = dict.fromkeys(start)
+    queue = deque(start)
+    while queue:
+        face = queue.popleft()
+        if face in goal:
+            he_v = goal[face]
+            crossed = []
+            while parent[face] is not None:
+                crossed.append(parent[face])
+                face = parent[face].inc
+            crossed.reverse()
+            return start[face], crossed, he_v
+        for he in face.surround_half_edges():
+            neighbor = he.twin.inc
+            if neighbor not in parent:
+                parent[neighbor] = he
+                queue.append(neighbor)
+    raise Exception(f"{u} and {v} are not connected")
+
+
+def planarize(G, pos=None):
+    """Planarize G.
+
+    Returns
+    -------
+    H : networkx graph
+        G with its crossings replaced by nodes ("crossing", k)
+
+    embedding : RotationSystem
+        a planar embedding of H
+
+    ext : (u, v)
+        a half-edge of H on the external face
+    """
+    H = None
+    if pos is not None:
+        H, removed = planar_subgraph(G, pos)
+    if H is None:
+        H, removed = planar_subgraph(G)
+        _, embedding = nx.check_planarity(H)
+        pos = nx.combinatorial_embedding_to_pos(embedding)
+    else:
+        embedding = rotation_system(H, pos)
+
+    ext = external_half_edge(H, pos)
+    if not removed:
+        return H, embedding, ext
+
+    dcel = Dcel(H, embedding)
+    faces = len(dcel.faces)
+    for u, v in removed:
+        he_u, crossed, he_v = _dual_path(dcel, u, v)
+        corners = []
+        for he in crossed:
+            a, b = he.id
+            node = ("crossing", len(H) - len(G))
+            dcel.add_node_between(a, node, b)
+            H.remove_edge(a, b)
+            H.add_edge(a, node)
+            H.add_edge(node, b)
+            if ext in ((a, b), (b, a)):
+                ext = ext[0], node
+            corners.append((dcel.half_edges[node, b], dcel.half_edges[node, a]))
+        # connect u, the crossing nodes and v through the faces in between
+        ends = [he_u] + [he for pair in corners for he in pair] + [he_v]
+        for first, second in zip(ends[::2], ends[1::2]):
+            _split_face(dcel, first, second, ("face", faces))
+            faces += 1
+            H.add_edge(first.ori.id, second.ori.id)
+
+    index = {}
+    for i, (a, b) in enumerate(H.edges):
+        index[a, b] = 2 * i
+        index[b, a] = 2 * i + 1
+    succ = [0] * len(index)
+    for he_id, he in dcel.half_edges.items():
+        succ[index[he_id]] = index[he.succ.id]
+    return H, RotationSystem(H, succ), ext
@@ -0,0 +1,123 @@
+"""Relayout after small edits which keeps the shape of the previous layout.
+
+After an edit the new embedding is compared with the previous one face by
+face. Faces within radius steps (in the dual graph) of a face that changed
+are solved again, every other arc of the flow network keeps the flow it had,
+so the untouched part of the drawing keeps its bends and angles. If the
+pinned flow leaves no feasible solution, the region grows until it covers
+the whole graph.
+
+This is not an incremental layout: every edit planarizes the graph again,
+builds a new DCEL and flow network and compacts the whole drawing, so it
+costs about as much as ortho_layout. Only the shape is kept, coordinates
+may still move everywhere.
+"""
+from .planarization import Planarization
+from .orthogonalization import Orthogonalization
+from .mincostflow import InfeasibleError
+from .compaction import Compaction
+
+__all__ = ["StableLayout"]
+
+
+class StableLayout:
+    """Orthogonal layout of a connected planar graph which is edited in place,
+    keeping the bends and angles of the faces away from every edit.
+
+    Parameters
+    ----------
+    G, init_pos, uselp, solver, compaction
+        as for ortho_layout
+
+    radius : int
+        faces this many dual steps away from a changed face are solved again
+    """
+
+    def __init__(self, G, init_pos=None, uselp=False, solver="auto", radius=2, compaction="flow"):
+        self.uselp = uselp
+        self.solver = solver
+        self.compaction = compaction
+        self.radius = radius
+        self.input = None
+        self.init_pos = None
+        self.flows = None  # (is corner, half-edge id) -> flow
+        self.faces = None  # (half-edge ids, is_external) of every face
+        self.update(G, init_pos)
+
+    def update(self, G, init_pos=None):
+        """Lay out the edited graph G, return (G, pos) as ortho_layout does"""
+        if init_pos is not None:
+            init_pos = {node: init_pos[node] for node in G}
+        planar = Planarization(G, init_pos)
+        dcel = planar.dcel
+        faces = {face.id: (frozenset((u, v) for _, _, u, v, _ in dcel.face_cycle(face.inc)),
+                           face.is_external)
+                 for face in dcel.faces.values()}
+
+        radius = self.radius
+        while True:
+            fixed = self._fixed_arcs(dcel, faces, radius)
+            try:
+                ortho = Orthogonalization(planar, self.uselp, self.solver, fixed)
+                break
+            except InfeasibleError:
+                if not fixed:
+                    raise
+                radius = 2 * radius + 1
+
+        # compaction changes both the dcel and flow_dict, take what comes next first
+        flow_dict = ortho.flow_dict
+        self.flows = {(True, he_id): flow_dict[v][f][he_id] for v, f, he_id in dcel.corners()}
+        self.flows.update(((False, he_id), flow_dict[lf][rf][he_id])
+                          for lf, rf, he_id in dcel.dual_edges())
+        self.faces = set(faces.values())
+        self.input = G
+        self.init_pos = init_pos
+        compa = Compaction(ortho, method=self.compaction)
+        self.G, self.pos = compa.G, compa.pos
+        return self.G, self.pos
+
+    def _fixed_arcs(self, dcel, faces, radius):
+        """Arcs outside the region around changed faces, with their old flow"""
+        if self.flows is None:
+            return {}
+        region = {f for f, signature in faces.items() if signature not in self.faces}
+        neighbors = {f: set() for f in faces}
+        for lf, rf, _ in dcel.dual_edges():
+            neighbors[lf].add(rf)
+            neighbors[rf].add(lf)
+        frontier = region
+        for _ in range(radius):
+            frontier = {g for f in frontier for g in neighbors[f]} - region
+            if not frontier:
+                break
+            region |= frontier
+        if len(region) == len(faces):
+            return {}
+
+        fixed = {}
+        for v, f, he_id in dcel.corners():
+            if f not in region and (True, he_id) in self.flows:
+                fixed[v, f, he_id] = self.flows[True, he_id]
+        for lf, rf, he_id in dcel.dual_edges():
+            if lf not in region and rf not in region and (False, he_id) in self.flows:
+                fixed[lf, rf, he_id] = self.flows[False, he_id]
+        return fixed
+
+    def add_edge(self, u, v, init_pos=None):
+        """Add edge (u, v), init_pos gives or moves positions of some nodes"""
+        G = self.input.copy()
+        G.add_edge(u, v)
+        return self.update(G, self._moved(init_pos))
+
+    def remove_edge(self, u, v, init_pos=None):
+        """Remove edge (u, v), nodes left without edges are removed too"""
+        G = self.input.copy()
+        G.remove_edge(u, v)
+        G.remove_nodes_from([node for node in (u, v) if G.degree(node) == 0])
+        return self.update(G, self._moved(init_pos))
+
+    def _moved(self, init_pos):
+        if self.init_pos is None:
+            return init_pos
+        return {**self.init_pos, **(init_pos or {})}
@@ -3,9 +3,10 @@
 from .planarization import Planarization
 from .orthogonalization import Orthogonalization
 from .compaction import Compaction
-from .utils import number_of_cross
+from .components import layout_components
+from .instrument import NULL_COLLECTOR
+from .utils import has_cross
 import networkx as nx
-from matplotlib import pyplot as plt
 
 __all__ = [
     "TSM",
@@ -14,63 +15,207 @@ __all__ = [
     "precheck"
 ]
 
-def ortho_layout(G, init_pos=None, uselp=True):
+def ortho_layout(G, init_pos=None, uselp=True, compact=False, solver="auto", workers=1,
+                 collector=NULL_COLLECTOR, compaction="flow", check_embedding=True,
+                 planarize=False, low_memory=False, routes=False):
     """
+    Parameters
+    ----------
+    G : Networkx graph
+        may be disconnected, its components are laid out independently and
+        packed into one drawing
+
+    solver : str
+        Backend of the linear program when uselp is True: "highs" (highspy),
+        "scipy" (HiGHS through scipy.optimize.milp), "cbc" (pulp), or "auto"
+        for the first of them that is installed.
+
+    compact : bool
+        Relabel nodes to dense integers and run on the array-backed
+        CompactDcel, which needs much less memory on large graphs.
+        Node names are mapped back before returning.
+
+    workers : int
+        With a disconnected G, lay out the components on this many
+        processes, os.cpu_count() if None.
+
+    collector : instrument.Collector
+        receives the wall and cpu time, problem sizes and solver results of
+        every stage. Not available for components laid out by workers.
+
+    compaction : str
+        "flow" for the smallest total edge length, or "longest_path" for a
+        linear time compaction which skips the two min-cost flows, see
+        Compaction.
+
+    check_embedding : bool
+        check that init_pos gives a planar embedding, which takes a pass
+        over the graph. Turn it off for trusted input without crossings.
+
+    planarize : bool
+        lay out a non-planar G, or one whose init_pos has crossings. Edges
+        left out of a maximal planar subgraph are routed through the fewest
+        other edges, the result has no nodes at the crossings.
+
+    low_memory : bool
+        lower the peak memory: G is not copied but turned into the returned
+        graph, and every stage frees what it built once the next one has
+        used it. Pass a graph you don't need any more. Measure the peaks
+        with Collector(memory=True).
+
+    routes : bool
+        return (pos, routes) instead of (G, pos). Bends stay inside the
+        layout, no node or edge is added to any graph and G is not copied.
+
     Returns
     -------
     G : Networkx graph
         which may contain bend nodes
 
     pos : dict
-        A dictionary of positions keyed by node
+        A dictionary of positions keyed by node, of the nodes of G only
+        with routes
+
+    routes : dict
+        with routes, maps every edge (u, v) of G.edges to the points of its
+        polyline, from pos[u] through the bends to pos[v]
     """
+    if routes:
+        pos, edge_routes = _ortho_layout(G, init_pos, uselp, compact, solver, workers, collector,
+                                         compaction, check_embedding, planarize, low_memory, True)
+        return pos, {(u, v): edge_routes[u, v] if (u, v) in edge_routes else edge_routes[v, u][::-1]
+                     for u, v in G.edges}
+    return _ortho_layout(G, init_pos, uselp, compact, solver, workers, collector, compaction,
+                         check_embedding, planarize, low_memory, False)
+
+
+def _ortho_layout(G, init_pos, uselp, compact, solver, workers, collector, compaction,
+                  check_embedding, planarize, low_memory, routes):
+    """ortho_layout, with routes in no particular direction"""
+
+    if len(G) < 2 or not nx.is_connected(G):
+        options = dict(uselp=uselp, compact=compact, solver=solver, compaction=compaction,
+                       check_embedding=check_embedding, planarize=planarize,
+                       low_memory=low_memory, routes=routes)
+        if workers is not None and workers <= 1:
+            options["collector"] = collector
+        with collector.stage("components") as info:
+            info["nodes"] = len(G)
+            return layout_components(G, init_pos, ortho_layout, workers, **options)
+
+    if compact:
+        return compact_layout(G, init_pos, uselp, solver, collector, compaction, check_embedding,
+                              planarize, low_memory, routes)
+
+    return _run_stages(G, init_pos, False, uselp, solver, collector, compaction,
+                       check_embedding, planarize, low_memory, routes)
 
-    planar = Planarization(G, init_pos)
-    ortho = Orthogonalization(planar, uselp)
-    compa = Compaction(ortho)
+
+def _run_stages(G, init_pos, compact, uselp, solver, collector, compaction, check_embedding,
+                planarize, low_memory, routes):
+    """Planarization, Orthogonalization and Compaction of a connected G.
+    Only the stage running is referenced from here, what the others leave
+    behind can be freed when low_memory is set.
+    Return (G, pos), or (pos, routes) with routes.
+    """
+    # with routes G is left as it is, so it need not be copied
+    ortho = Orthogonalization(
+        Planarization(G, init_pos, compact, collector, check_embedding, planarize,
+                      low_memory or routes),
+        uselp, solver, collector=collector, low_memory=low_memory)
+    compa = Compaction(ortho, collector, compaction, low_memory, routes)
+    if routes:
+        return compa.pos, compa.routes
     return compa.G, compa.pos
 
 
+def compact_layout(G, init_pos=None, uselp=True, solver="auto", collector=NULL_COLLECTOR,
+                   compaction="flow", check_embedding=True, planarize=False, low_memory=False,
+                   routes=False):
+    """ortho_layout on CompactDcel, with nodes relabeled to 0..n-1"""
+    nodes = list(G)
+    if nodes == list(range(len(nodes))):  # already dense, nothing to relabel
+        return _run_stages(G, init_pos, True, uselp, solver, collector, compaction,
+                           check_embedding, planarize, low_memory, routes)
+
+    index = {node: i for i, node in enumerate(nodes)}
+    H = nx.relabel_nodes(G, index)
+    if init_pos is not None:
+        init_pos = {index[node]: p for node, p in init_pos.items() if node in index}
+
+    # H and the stages working on it are private, nothing needs to be kept or copied
+    result = _run_stages(H, init_pos, True, uselp, solver, collector, compaction,
+                         check_embedding, planarize, True, routes)
+
+    def restore(node):
+        return nodes[node] if type(node) is int else node
+
+    if routes:
+        pos, edge_routes = result
+        return ({nodes[node]: p for node, p in pos.items()},
+                {(nodes[u], nodes[v]): points for (u, v), points in edge_routes.items()})
+    H, pos = result
+    pos = {restore(node): p for node, p in pos.items()}
+    return nx.relabel_nodes(H, restore), pos
+
+
 def is_bendnode(node):
     return type(node) is tuple and len(node) > 1 and node[0] == "bend"
 
 
-def precheck(G, pos=None):
-    """Check if input is valid. If not, raise an exception"""
-    if max(degree for node, degree in G.degree) > 4:
+def precheck(G, pos=None, planarize=False):
+    """Check if input is valid. If not, raise an exception.
+    With planarize, a non-planar G or crossings in pos are allowed.
+    """
+    if max((degree for node, degree in G.degree), default=0) > 4:
         raise Exception(
             "Max node degree larger than 4, which is not supported currently")
     if nx.number_of_selfloops(G) > 0:
         raise Exception("G contains selfloop")
-    if not nx.is_connected(G):
-        raise Exception("G is not a connected graph")
 
-    if pos is None:
+    if planarize:  # crossings become nodes
+        pass
+    elif pos is None:
         is_planar, _ = nx.check_planarity(G)
         if not is_planar:
             raise Exception("G is not a planar graph")
-    else:
-        if number_of_cross(G, pos) > 0:
-            raise Exception("There are cross edges in given layout")
+    elif has_cross(G, pos):
+        raise Exception("There are cross edges in given layout")
 
     for node in G.nodes:
-        if type(node) is tuple and len(node) > 1 and node[0] in ("dummy", "bend"):
+        if type(node) is tuple and len(node) > 1 and node[0] in ("dummy", "bend", "crossing"):
             raise Exception(f"Invalid node name: {node}")
 
 
-# TODO: implement it rightly in the future
-# def postcheck(G, pos):
-#     """Check if there is cross or overlay in layout"""
-#     for u, v in G.edges:
-#         assert pos[u][0] == pos[v][0] or pos[u][1] == pos[v][1]
+class TSM:
+    def __init__(self, G, init_pos=None, uselp=False, compact=False, solver="auto", workers=1,
+                 collector=NULL_COLLECTOR, compaction="flow", check_embedding=True,
+                 planarize=False, low_memory=False):
+        self.G, self.pos = ortho_layout(G, init_pos, uselp, compact, solver, workers, collector,
+                                        compaction, check_embedding, planarize, low_memory)
+
+    def write_svg(self, file, **kwargs):
+        """Write the layout as SVG without matplotlib, see export.write_svg"""
+        from .export import write_svg
 
+        write_svg(self.G, self.pos, file, **kwargs)
 
-class TSM:
-    def __init__(self, G, init_pos=None, uselp=False):
-        self.G, self.pos = ortho_layout(G, init_pos, uselp)
+    def write_json(self, file):
+        """Write nodes and edge polylines as JSON, see export.write_json"""
+        from .export import write_json
+
+        write_json(self.G, self.pos, file)
+
+    def to_arrays(self):
+        """The layout as NumPy arrays, see arrays.layout_arrays"""
+        from .arrays import layout_arrays
+
+        return layout_arrays(self.G, self.pos)
 
     def display(self):
         """Draw layout with networkx draw lib"""
+        from matplotlib import pyplot as plt
+
         plt.axis('off')
         # draw edge first, otherwise edge may not be shown in result
         nx.draw_networkx_edges(self.G, self.pos)
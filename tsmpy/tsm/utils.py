@@ -1,114 +1,272 @@
 from networkx import PlanarEmbedding
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import chain
 from math import atan2
 import networkx as nx
-import matplotlib.patches as mpatches
-from matplotlib import pyplot as plt
+from tsmpy.dcel import RotationSystem
+
+
+def neighbors_ccw(G, pos, node):
+    """Neighbors of node sorted counter clockwise by direction in pos"""
+    neigh_pos = {
+        neigh: (pos[neigh][0]-pos[node][0], pos[neigh][1]-pos[node][1]) for neigh in G[node]
+    }
+    return sorted(G.adj[node], key=lambda v: atan2(neigh_pos[v][1], neigh_pos[v][0]))
 
 
 def convert_pos_to_embedding(G, pos):
     """Make sure only straight line in layout"""
     emd = PlanarEmbedding()
     for node in G:
-        neigh_pos = {
-            neigh: (pos[neigh][0]-pos[node][0], pos[neigh][1]-pos[node][1]) for neigh in G[node]
-        }
-        neighes_sorted = sorted(G.adj[node],
-                                key=lambda v: atan2(
-                                    neigh_pos[v][1], neigh_pos[v][0])
-                                )  # counter clockwise
         last = None
-        for neigh in neighes_sorted:
+        for neigh in neighbors_ccw(G, pos, node):
             emd.add_half_edge_ccw(node, neigh, last)
             last = neigh
     emd.check_structure()
     return emd
 
 
-def number_of_cross(G, pos):
-    """Return the number of edge crossings in ``G`` given ``pos``.
+def rotation_system(G, pos):
+    """The rotation system of the straight-line drawing pos, as a
+    RotationSystem for the DCELs. Neighbors are sorted counterclockwise
+    as in convert_pos_to_embedding, without building a PlanarEmbedding
+    or checking the structure, see Planarization for the check.
+
+    With numpy installed all angles are computed at once and sorted with
+    one lexsort, otherwise node by node.
+    """
+    edges = list(G.edges)
+    if not edges:
+        return RotationSystem(G, [])
+    try:
+        import numpy as np
+    except ImportError:
+        index = {}
+        for i, (u, v) in enumerate(edges):
+            index[u, v] = 2 * i
+            index[v, u] = 2 * i + 1
+        ccw = [0] * (2 * len(edges))  # the next half-edge counterclockwise around its origin
+        for node in G:
+            ring = [index[node, neigh] for neigh in neighbors_ccw(G, pos, node)]
+            for h, nxt in zip(ring, ring[1:] + ring[:1]):
+                ccw[h] = nxt
+        return RotationSystem(G, [ccw[h ^ 1] for h in range(len(ccw))])
+
+    nodes = {node: i for i, node in enumerate(G)}
+    coords = np.array([pos[node] for node in G], dtype=float).reshape(-1, 2)
+    ends = np.fromiter(map(nodes.__getitem__, chain.from_iterable(edges)),
+                       dtype=np.intp, count=2 * len(edges))
+    # half-edge 2i goes from ends[2i] to ends[2i + 1], half-edge 2i + 1 back
+    ori, dst = ends, ends.reshape(-1, 2)[:, ::-1].reshape(-1)
+    delta = coords[dst] - coords[ori]
+    angle = np.arctan2(delta[:, 1], delta[:, 0])
+    order = np.lexsort((angle, ori))  # by origin, then counterclockwise
+    grouped = ori[order]
+    nxt = np.arange(1, len(order) + 1)
+    last = np.flatnonzero(np.append(grouped[1:] != grouped[:-1], True))
+    first = np.append(0, last[:-1] + 1)
+    nxt[last] = first  # the ring closes
+    ccw = np.empty_like(order)
+    ccw[order] = order[nxt]
+    succ = ccw[np.arange(len(ccw)) ^ 1]
+    return RotationSystem(G, succ.tolist())
+
+
+def _segments_intersect(p1, q1, p2, q2):
+    """Return True if segment p1q1 and segment p2q2 share at least one point.
+
+    Standard orientation test, also handles the collinear overlap cases.
+    """
+    def orientation(p, q, r):
+        val = (q[1] - p[1]) * (r[0] - q[0]) - (q[0] - p[0]) * (r[1] - q[1])
+        if val == 0:
+            return 0
+        return 1 if val > 0 else 2
+
+    def on_segment(p, q, r):
+        return (
+            min(p[0], r[0]) <= q[0] <= max(p[0], r[0])
+            and min(p[1], r[1]) <= q[1] <= max(p[1], r[1])
+        )
+
+    o1 = orientation(p1, q1, p2)
+    o2 = orientation(p1, q1, q2)
+    o3 = orientation(p2, q2, p1)
+    o4 = orientation(p2, q2, q1)
+
+    if o1 != o2 and o3 != o4:
+        return True
+    if o1 == 0 and on_segment(p1, p2, q1):
+        return True
+    if o2 == 0 and on_segment(p1, q2, q1):
+        return True
+    if o3 == 0 and on_segment(p2, p1, q2):
+        return True
+    if o4 == 0 and on_segment(p2, q1, q2):
+        return True
+    return False
+
+
+def crossing_pairs(G, pos):
+    """Yield the pairs of edges of ``G`` which cross in ``pos``.
+
+    Edges sharing an endpoint never cross, and collinear overlapping edges
+    count as crossing.
+
+    Edges are bucketed into a uniform grid by their bounding boxes, and
+    only edges sharing a cell are tested, so a layout with short edges
+    costs about O(E) instead of O(E^2). A pair is tested only in the cell
+    holding the lower-left corner of the intersection of their bounding
+    boxes, which makes every pair tested at most once.
+    """
+    edges = [(a, b) for a, b in G.edges if a != b]
+    if len(edges) < 2:
+        return
+
+    boxes = []
+    extent = 0
+    for a, b in edges:
+        (xa, ya), (xb, yb) = pos[a], pos[b]
+        box = (min(xa, xb), min(ya, yb), max(xa, xb), max(ya, yb))
+        extent += max(box[2] - box[0], box[3] - box[1])
+        boxes.append(box)
+    x0 = min(box[0] for box in boxes)
+    y0 = min(box[1] for box in boxes)
+    cell = extent / len(edges)
+    if cell <= 0:
+        cell = 1
+
+    def cell_of(x, y):
+        return int((x - x0) // cell), int((y - y0) // cell)
+
+    def number_of_cells(box):
+        (cx0, cy0), (cx1, cy1) = cell_of(box[0], box[1]), cell_of(box[2], box[3])
+        return (cx1 - cx0 + 1) * (cy1 - cy0 + 1)
+
+    # a few long edges could cover too many cells, coarsen the grid then
+    while sum(map(number_of_cells, boxes)) > 8 * len(boxes):
+        cell *= 2
+
+    grid = {}
+    for i, (xmin, ymin, xmax, ymax) in enumerate(boxes):
+        (cx0, cy0), (cx1, cy1) = cell_of(xmin, ymin), cell_of(xmax, ymax)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                grid.setdefault((cx, cy), []).append(i)
+
+    for key, members in grid.items():
+        for k, i in enumerate(members):
+            a, b = edges[i]
+            xmin_i, ymin_i, xmax_i, ymax_i = boxes[i]
+            for j in members[k + 1:]:
+                xmin_j, ymin_j, xmax_j, ymax_j = boxes[j]
+                left, bottom = max(xmin_i, xmin_j), max(ymin_i, ymin_j)
+                if left > min(xmax_i, xmax_j) or bottom > min(ymax_i, ymax_j):
+                    continue  # bounding boxes are disjoint
+                if cell_of(left, bottom) != key:
+                    continue  # tested in another cell
+                c, d = edges[j]
+                if len({a, b, c, d}) == 4:
+                    if _segments_intersect(pos[a], pos[b], pos[c], pos[d]):
+                        yield edges[i], edges[j]
 
-    Each crossing is counted once. The routine relies on a robust
-    segment intersection test and avoids double counting by iterating
-    over unique edge pairs.
 
-    The previous implementation relied on an ad-hoc vector product
-    check which produced false positives for some layouts (see issue
-    #6 of the upstream project).  The routine below follows the
-    standard segment intersection algorithm using orientation tests and
-    also handles collinear overlap cases correctly.
+def number_of_cross(G, pos, stop_at_first=False):
+    """Return the number of edge crossings in ``G`` given ``pos``, see
+    crossing_pairs. Each crossing is counted once.
+
+    If ``stop_at_first`` is True, return 1 as soon as a crossing is found.
     """
+    count = 0
+    for _ in crossing_pairs(G, pos):
+        if stop_at_first:
+            return 1
+        count += 1
+    return count
+
+
+def has_cross(G, pos):
+    """Return True if any two edges of ``G`` cross in ``pos``"""
+    return number_of_cross(G, pos, stop_at_first=True) > 0
 
-    def do_intersect(p1, q1, p2, q2):
-        def orientation(p, q, r):
-            val = (q[1] - p[1]) * (r[0] - q[0]) - (q[0] - p[0]) * (r[1] - q[1])
-            if val == 0:
-                return 0
-            return 1 if val > 0 else 2
-
-        def on_segment(p, q, r):
-            return (
-                min(p[0], r[0]) <= q[0] <= max(p[0], r[0])
-                and min(p[1], r[1]) <= q[1] <= max(p[1], r[1])
-            )
-
-        o1 = orientation(p1, q1, p2)
-        o2 = orientation(p1, q1, q2)
-        o3 = orientation(p2, q2, p1)
-        o4 = orientation(p2, q2, q1)
-
-        if o1 != o2 and o3 != o4:
-            return True
-        if o1 == 0 and on_segment(p1, p2, q1):
-            return True
-        if o2 == 0 and on_segment(p1, q2, q1):
-            return True
-        if o3 == 0 and on_segment(p2, p1, q2):
-            return True
-        if o4 == 0 and on_segment(p2, q1, q2):
-            return True
-        return False
 
+def number_of_cross_pairwise(G, pos):
+    """Reference O(E^2) version of number_of_cross, testing every pair of edges"""
     count = 0
     edges = list(G.edges)
     for i, (a, b) in enumerate(edges):
         for c, d in edges[i + 1:]:
             if len({a, b, c, d}) == 4:
-                if do_intersect(pos[a], pos[b], pos[c], pos[d]):
+                if _segments_intersect(pos[a], pos[b], pos[c], pos[d]):
                     count += 1
 
     return count
 
 
-def overlap_nodes(G, pos):  # not efficient
-    inv_pos = {}
+def overlap_nodes(G, pos):
+    """Return nodes placed at the same position as another node"""
+    inv_pos = defaultdict(list)
     for k, v in pos.items():
-        v = tuple(v)  # compatible with pos given by nx.spring_layout()
-        inv_pos[v] = inv_pos.get(v, ()) + (k,)
+        inv_pos[tuple(v)].append(k)  # compatible with pos given by nx.spring_layout()
     return [node for nodes in inv_pos.values() if len(nodes) > 1 for node in nodes]
 
 
-def overlay_edges(G, pos):  # not efficient
-    res = set()
+def _overlapping_intervals(intervals):
+    """Given [(lo, hi, item)] with lo <= hi, return items whose open interval
+    (lo, hi) meets the interval of another item, i.e. lo1 < hi2 and lo2 < hi1.
+    """
+    intervals.sort(key=lambda t: t[0])
+    los = [lo for lo, _, _ in intervals]
+    # the two largest hi among intervals[:k], as (hi, index)
+    best = [(float("-inf"), -1), (float("-inf"), -1)]
+    prefix_best = [tuple(best)]
+    for i, (_, hi, _) in enumerate(intervals):
+        if hi > best[0][0]:
+            best = [(hi, i), best[0]]
+        elif hi > best[1][0]:
+            best = [best[0], (hi, i)]
+        prefix_best.append(tuple(best))
+
+    res = []
+    for i, (lo, hi, item) in enumerate(intervals):
+        # the others with lo2 < hi are exactly intervals[:k]
+        k = bisect_left(los, hi)
+        first, second = prefix_best[k]
+        hi2 = second[0] if first[1] == i else first[0]
+        if hi2 > lo:
+            res.append(item)
+    return res
+
+
+def overlay_edges(G, pos):
+    """Return axis-parallel edges which overlap another collinear edge.
+
+    Vertical edges are grouped by x and horizontal edges by y, then the
+    intervals in each group are checked with one sort, O(E log E) overall.
+    """
+    vertical = defaultdict(list)
+    horizontal = defaultdict(list)
     for a, b in G.edges:
         (xa, ya), (xb, yb) = pos[a], pos[b]
-        for c, d in G.edges:
-            (xc, yc), (xd, yd) = pos[c], pos[d]
-            if (a, b) != (c, d):
-                if xa == xb == xc == xd:
-                    if min(ya, yb) >= max(yc, yd) or max(ya, yb) <= min(yc, yd):
-                        continue
-                    res.add((a, b))
-                    res.add((c, d))
-                if ya == yb == yc == yd:
-                    if min(xa, xb) >= max(xc, xd) or max(xa, xb) <= min(xc, xd):
-                        continue
-                    res.add((a, b))
-                    res.add((c, d))
+        if xa == xb:
+            vertical[xa].append((min(ya, yb), max(ya, yb), (a, b)))
+        if ya == yb:
+            horizontal[ya].append((min(xa, xb), max(xa, xb), (a, b)))
+
+    res = set()
+    for groups in (vertical, horizontal):
+        for intervals in groups.values():
+            if len(intervals) > 1:
+                res.update(_overlapping_intervals(intervals))
     return list(res)
 
 
 def draw_overlay(G, pos, is_bendnode):
     """Draw graph and highlight bendnodes, overlay nodes and edges"""
+    import matplotlib.patches as mpatches
+    from matplotlib import pyplot as plt
+
     plt.axis('off')
     # draw edge first, otherwise edge may not show in plt result
     # draw all edges